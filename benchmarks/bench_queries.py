@@ -0,0 +1,194 @@
+"""查询与渲染基准：在合成数据上计时 Utils 查询路径与 MapVisualizer.process_all
+
+用法（在仓库根目录）：
+    python -m benchmarks.bench_queries --users 50 --drops 400 --blueprints 2000 --output bench.json
+    python -m benchmarks.bench_queries --compare bench.json --threshold 1.25
+
+cold 为每个用户的首次调用（包含上传文件解析与主数据加载），warm 为缓存命中后的重复调用。
+指定 --compare 时与基准文件比较 warm 中位数，超过阈值的项目会列出并以状态码 1 退出。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+from src.binding_store import BindingStore
+from src.master_data import MasterData
+from src.msa_class import MapVisualizer
+from src.upload_cache import UploadCache
+from src.utils import Utils
+
+from .synthetic import MATERIAL_IDS, make_assets, make_master, make_users
+
+def build_utils(root: Path) -> Utils:
+    """指向合成数据目录的 Utils，不触碰仓库内的数据与数据库"""
+    utils = Utils()
+    utils.base_path = root
+    utils.master = MasterData(root / "data")
+    utils.store = BindingStore(root / "bindings.db")
+    utils.uploads = UploadCache()
+    return utils
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def time_calls(func: Callable, calls: List[tuple]) -> List[float]:
+    samples = []
+    for args in calls:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench(utils: Utils, name: str, func: Callable, calls: List[tuple], repeat: int) -> Dict[str, Dict]:
+    """先清空缓存跑一轮 cold，再跑 repeat 轮 warm"""
+    utils.uploads = UploadCache()
+    utils.master.invalidate()
+    cold = time_calls(func, calls)
+    warm = []
+    for _ in range(repeat):
+        warm.extend(time_calls(func, calls))
+    print(f"{name:28s} cold {statistics.median(cold) * 1000:8.2f} ms  warm {statistics.median(warm) * 1000:8.2f} ms",
+          file=sys.stderr)
+    return {"cold": summarize(cold), "warm": summarize(warm)}
+
+def bench_render(root: Path, user_ids: List[str], repeat: int, workers: int) -> Dict[str, Dict]:
+    samples = []
+    for _ in range(repeat):
+        for user_id in user_ids:
+            visualizer = MapVisualizer(
+                id=user_id,
+                json_file=str(root / "data" / Utils.USER_DATA["mysekai"][0].format(user_id)),
+                base_folder=str(root),
+                icon_folder=str(root / "icon"),
+                output_folder=str(root / "output"),
+                workers=workers,
+            )
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                visualizer.process_all()
+            samples.append(time.perf_counter() - start)
+    print(f"{'MapVisualizer.process_all':28s} {statistics.median(samples) * 1000:8.2f} ms", file=sys.stderr)
+    return {"warm": summarize(samples)}
+
+def run(args: argparse.Namespace, root: Path) -> Dict:
+    master_sizes = make_master(root / "data", args.blueprints)
+    points = max(1, round(args.drops / 2.5))
+    user_ids = make_users(root, args.users, points, args.blueprints, args.padding)
+
+    utils = build_utils(root)
+    rng = random.Random(0)
+    for user_id in user_ids:
+        utils.bond_sub(user_id, rng.sample(MATERIAL_IDS, 6))
+
+    names = [(user_id, f"user{user_id}") for user_id in user_ids]
+    translate_input = {material_id: rng.randint(1, 999) for material_id in MATERIAL_IDS}
+    results = {
+        "get_materials_needed": bench(
+            utils, "get_materials_needed", utils.get_materials_needed,
+            [(1000, 40, user_id, name) for user_id, name in names], args.repeat
+        ),
+        "get_materials_needed_all": bench(
+            utils, "get_materials_needed_all", utils.get_materials_needed_all,
+            [(40, user_id, name) for user_id, name in names], args.repeat
+        ),
+        "data_translate": bench(
+            utils, "data_translate", utils.data_translate,
+            [(translate_input,)] * len(user_ids), args.repeat
+        ),
+        "get_harvest_info": bench(
+            utils, "get_harvest_info", utils.get_harvest_info, names, args.repeat
+        ),
+        "get_blurprints_unobtained": bench(
+            utils, "get_blurprints_unobtained", utils.get_blurprints_unobtained,
+            [(20, user_id, name) for user_id, name in names], args.repeat
+        ),
+    }
+    if args.render_users:
+        make_assets(root)
+        results["process_all"] = bench_render(root, user_ids[:args.render_users], args.render_repeat, args.workers)
+
+    data = root / "data"
+    drops = [
+        len(site["userMysekaiSiteHarvestResourceDrops"])
+        for site in utils.load_user_data(user_ids[0], "mysekai").harvest_maps
+    ]
+    return {
+        "params": vars(args),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "data": {
+            "master_bytes": master_sizes,
+            "suite_bytes": (data / Utils.USER_DATA["suite"][0].format(user_ids[0])).stat().st_size,
+            "mysekai_bytes": (data / Utils.USER_DATA["mysekai"][0].format(user_ids[0])).stat().st_size,
+            "drops_per_site": drops,
+        },
+        "results": results,
+    }
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """warm 中位数相对基准变慢超过 threshold 倍的项目"""
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        now, before = result["warm"]["median_ms"], base["warm"]["median_ms"]
+        if before > 0 and now / before > threshold:
+            regressions.append(f"{name}: {before:.2f} ms -> {now:.2f} ms ({now / before:.2f}x)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="用户数")
+    parser.add_argument("--drops", type=int, default=300, help="每张地图的掉落条目数（约数）")
+    parser.add_argument("--blueprints", type=int, default=1500, help="蓝图总数，每个用户获得一半")
+    parser.add_argument("--padding", type=int, default=2000, help="suite 中不会被读取的卡牌条目数")
+    parser.add_argument("--repeat", type=int, default=5, help="warm 轮数")
+    parser.add_argument("--render-users", type=int, default=1, help="参与渲染计时的用户数，0 为跳过")
+    parser.add_argument("--render-repeat", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1, help="渲染进程数")
+    parser.add_argument("--output", type=Path, help="结果 JSON 路径，默认输出到标准输出")
+    parser.add_argument("--compare", type=Path, help="基准结果 JSON")
+    parser.add_argument("--threshold", type=float, default=1.25, help="判定为退化的倍数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run(args, Path(tmp))
+    report["params"] = {k: str(v) if isinstance(v, Path) else v for k, v in report["params"].items()}
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"regression: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""渲染基准：逐点整图合成（旧） vs 逐点局部合成（新）
+
+用法（在仓库根目录）：python -m benchmarks.bench_render --points 300
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from PIL import Image, ImageDraw
+
+from src.msa_class import MapVisualizer, SceneConfig
+
+from .synthetic import make_assets, make_map
+
+class LegacyMapVisualizer(MapVisualizer):
+    """旧版渲染流程：每个资源点都对整张地图做一次 alpha_composite"""
+
+    def draw_rewards_legacy(self, background: Image.Image, x: int, y: int, reward: Dict, scene: SceneConfig):
+        icon_size = 20
+        offset = scene.physical_width * 0.3
+        items = []
+        for category, category_items in reward.items():
+            for item_id, quantity in category_items.items():
+                icon = self.load_icon(category, int(item_id), icon_size)
+                if icon:
+                    items.append((icon, quantity))
+        if not items:
+            return
+        if scene.reverse_xy:
+            total_width, total_height = len(items) * icon_size, icon_size
+            start_x, start_y = int(x + offset), int(y - icon_size / 2)
+        else:
+            total_width, total_height = icon_size, len(items) * icon_size
+            start_x, start_y = int(x + offset), int(y)
+        overlay = Image.new('RGBA', background.size, (255, 255, 255, 0))
+        ImageDraw.Draw(overlay).rectangle(
+            [start_x, start_y, start_x + total_width, start_y + total_height],
+            fill=(138, 138, 138, 180)
+        )
+        background.paste(Image.alpha_composite(background, overlay), (0, 0))
+        for i, (icon, quantity) in enumerate(items):
+            if scene.reverse_xy:
+                icon_x, icon_y = start_x + i * icon_size, start_y
+            else:
+                icon_x, icon_y = start_x, start_y + i * icon_size
+            background.paste(icon, (icon_x, icon_y), icon)
+            if quantity > 1:
+                draw = ImageDraw.Draw(background)
+                text = str(quantity)
+                text_x, text_y = icon_x + icon_size - 8, icon_y + icon_size - 10
+                bbox = draw.textbbox((text_x, text_y), text, font=self.font)
+                draw.ellipse([bbox[0]-2, bbox[1]-2, bbox[2]+2, bbox[3]+2], fill=(255, 255, 255, 128))
+                draw.text((text_x, text_y), text, fill=(0, 0, 0), font=self.font)
+
+    def process_map(self, map_data: Dict, site_id: int):
+        scene = self.SCENES[site_id]
+        background = Image.open(self.base_folder / scene.image_path).convert('RGBA')
+        draw = ImageDraw.Draw(background)
+        for point in self.parse_raw_map_data(map_data):
+            x, y = self.game_to_pixel(point["location"][0], point["location"][1], scene, *background.size)
+            color = self.FIXTURE_COLORS.get(point["fixtureId"], (0, 0, 0))
+            draw.ellipse([x - self.point_size, y - self.point_size, x + self.point_size, y + self.point_size],
+                         fill=color, outline=(0, 0, 0), width=2)
+            self.draw_rewards_legacy(background, x, y, point["reward"], scene)
+        background.save(self.output_folder / f"{self.id}_map_{site_id}.png")
+
+def time_render(cls, root: Path, maps: List[Dict], repeat: int) -> float:
+    visualizer = cls(
+        id="bench",
+        json_file=str(root / "unused.json"),
+        base_folder=str(root),
+        icon_folder=str(root / "icon"),
+        output_folder=str(root / "output"),
+    )
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for map_data in maps:
+                visualizer.process_map(map_data, map_data["mysekaiSiteId"])
+        best = min(best, time.perf_counter() - start)
+    return best / len(maps)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=150, help="每张地图的资源点数")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_assets(root)
+        maps = [make_map(site_id, args.points) for site_id in MapVisualizer.SCENES]
+        before = time_render(LegacyMapVisualizer, root, maps, args.repeat)
+        after = time_render(MapVisualizer, root, maps, args.repeat)
+    print(f"points/map={args.points}")
+    print(f"before: {before * 1000:.1f} ms/map")
+    print(f"after:  {after * 1000:.1f} ms/map  ({before / after:.1f}x)")
+
+if __name__ == "__main__":
+    main()
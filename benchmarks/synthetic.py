@@ -0,0 +1,171 @@
+"""合成数据：主数据、suite / mysekai 上传与渲染素材
+
+所有生成器都使用固定种子，同样的参数得到同样的文件。
+"""
+import json
+import random
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from PIL import Image
+
+from src.gate_cost import MAX_GATE_LEVEL, UNIT_GROUPS
+from src.master_data import MasterData
+from src.msa_class import MapVisualizer
+from src.utils import Utils
+
+REPO_DATA = Path(__file__).parent.parent / "data"
+
+MATERIAL_IDS = list(MapVisualizer.ICON_MAPPINGS["mysekai_material"])
+CRAFT_TYPES = ("mysekai_fixture", "mysekai_canvas", "mysekai_sticker")
+
+def make_assets(root: Path, size: int = 1600) -> None:
+    """生成背景图与图标占位"""
+    rng = random.Random(0)
+    for scene in MapVisualizer.SCENES.values():
+        path = root / scene.image_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        Image.new('RGB', (size, size * 3 // 4), (rng.randrange(256), 140, 120)).save(path)
+    icon_folder = root / "icon"
+    icon_folder.mkdir(exist_ok=True)
+    for mapping in MapVisualizer.ICON_MAPPINGS.values():
+        for name in (mapping.values() if isinstance(mapping, dict) else [mapping]):
+            Image.new('RGBA', (128, 128), (rng.randrange(256), 60, 200, 255)).save(icon_folder / name)
+
+def make_map(site_id: int, points: int, seed: int = 0) -> Dict:
+    """生成单张地图的原始 API 数据，每个资源点 1~4 个掉落"""
+    rng = random.Random(seed + site_id)
+    fixtures: List[Dict] = []
+    drops: List[Dict] = []
+    for _ in range(points):
+        x, z = round(rng.uniform(-15, 15), 1), round(rng.uniform(-15, 15), 1)
+        fixtures.append({
+            "mysekaiSiteHarvestFixtureId": rng.choice(list(MapVisualizer.FIXTURE_COLORS)),
+            "positionX": x,
+            "positionZ": z,
+            "userMysekaiSiteHarvestFixtureStatus": "spawned",
+        })
+        for _ in range(rng.randint(1, 4)):
+            drops.append({
+                "positionX": x,
+                "positionZ": z,
+                "resourceType": "mysekai_material",
+                "resourceId": rng.choice(MATERIAL_IDS),
+                "quantity": rng.randint(1, 6),
+            })
+    return {
+        "mysekaiSiteId": site_id,
+        "userMysekaiSiteHarvestFixtures": fixtures,
+        "userMysekaiSiteHarvestResourceDrops": drops,
+    }
+
+def write_json(path: Path, data) -> int:
+    """写出 JSON 并返回字节数"""
+    text = json.dumps(data, ensure_ascii=False)
+    path.write_text(text, encoding="utf-8")
+    return len(text.encode("utf-8"))
+
+def make_master(data: Path, blueprints: int, seed: int = 0) -> Dict[str, int]:
+    """写出查询所需的主数据文件，返回 文件名 -> 字节数"""
+    rng = random.Random(seed)
+    data.mkdir(parents=True, exist_ok=True)
+    master = MasterData(data)
+    sizes = {}
+
+    gate_materials = []
+    for unit in UNIT_GROUPS:
+        for level in range(1, MAX_GATE_LEVEL + 1):
+            for material_id in rng.sample(MATERIAL_IDS, 3):
+                gate_materials.append({
+                    "groupId": unit + level,
+                    "mysekaiMaterialId": material_id,
+                    "quantity": rng.randint(1, 10) * level,
+                })
+    sizes["gate_materials"] = write_json(master.path("gate_materials"), gate_materials)
+
+    materials = [{"id": material_id, "name": f"材料{material_id}"} for material_id in MATERIAL_IDS]
+    sizes["materials"] = write_json(master.path("materials"), materials)
+
+    fixtures = []
+    blueprint_rows = []
+    for i in range(1, blueprints + 1):
+        fixtures.append({
+            "id": 10000 + i,
+            "name": f"家具{i}",
+            "mysekaiFixtureMainGenreId": rng.randint(1, 12),
+            "mysekaiFixtureSubGenreId": rng.randint(1, 40),
+            "mysekaiFixtureTagGroupId": rng.randint(1, 100),
+        })
+        blueprint_rows.append({
+            "id": i,
+            "craftTargetId": 10000 + i,
+            "mysekaiCraftType": rng.choice(CRAFT_TYPES),
+        })
+    sizes["fixtures"] = write_json(master.path("fixtures"), fixtures)
+    sizes["blueprints"] = write_json(master.path("blueprints"), blueprint_rows)
+
+    phenomenas = [{"id": i, "name": f"天气{i}"} for i in range(1, 9)]
+    sizes["phenomenas"] = write_json(master.path("phenomenas"), phenomenas)
+
+    shutil.copy(REPO_DATA / master.FILES["reference"], master.path("reference"))
+    return sizes
+
+def make_suite(user_id: str, padding: int = 0, seed: int = 0) -> Dict:
+    """suite 上传：大门等级、持有材料，padding 为不会被使用的卡牌条目数"""
+    rng = random.Random(f"suite-{user_id}-{seed}")
+    return {
+        "upload_time": int(time.time()),
+        "userMysekaiGates": [
+            {
+                "mysekaiGateId": unit // 1000,
+                "mysekaiGateLevel": rng.randint(0, MAX_GATE_LEVEL - 1),
+                "isSettingAtHomeSite": unit == UNIT_GROUPS[0],
+            }
+            for unit in UNIT_GROUPS
+        ],
+        "userMysekaiMaterials": [
+            {"mysekaiMaterialId": material_id, "quantity": rng.randint(0, 500)}
+            for material_id in MATERIAL_IDS
+        ],
+        "userCards": [
+            {"cardId": i, "level": rng.randint(1, 60), "masterRank": rng.randint(0, 5), "episodes": [1, 2]}
+            for i in range(padding)
+        ],
+    }
+
+def make_mysekai(user_id: str, points: int, blueprints: int, seed: int = 0) -> Dict:
+    """mysekai 上传：四张地图、已获得的一半蓝图与天气预报"""
+    rng = random.Random(f"ms-{user_id}-{seed}")
+    now = int(time.time())
+    obtained = rng.sample(range(1, blueprints + 1), blueprints // 2)
+    return {
+        "upload_time": now,
+        "mysekaiPhenomenaSchedules": [
+            {
+                "scheduleDate": (now - now % 86400 + day * 86400) * 1000,
+                "mysekaiRefreshTimePeriodId": period,
+                "mysekaiPhenomenaId": rng.randint(1, 8),
+            }
+            for day in range(2)
+            for period in (1, 2)
+        ],
+        "updatedResources": {
+            "now": now * 1000,
+            "userMysekaiHarvestMaps": [
+                make_map(site_id, points, seed=rng.randrange(1 << 30)) for site_id in MapVisualizer.SCENES
+            ],
+            "userMysekaiBlueprints": [{"mysekaiBlueprintId": i} for i in obtained],
+        },
+    }
+
+def make_users(root: Path, users: int, points: int, blueprints: int, padding: int = 0) -> List[str]:
+    """在 root/data 下写出 users 个用户的 suite 与 mysekai 上传，返回用户 id"""
+    data = root / "data"
+    data.mkdir(parents=True, exist_ok=True)
+    user_ids = [str(100000 + i) for i in range(users)]
+    for user_id in user_ids:
+        write_json(data / Utils.USER_DATA["suite"][0].format(user_id), make_suite(user_id, padding))
+        write_json(data / Utils.USER_DATA["mysekai"][0].format(user_id), make_mysekai(user_id, points, blueprints))
+    return user_ids
@@ -1,11 +1,27 @@
-from nonebot import on_command
-from nonebot.adapters.onebot.v11 import Bot, Message, GroupMessageEvent, MessageSegment
+from nonebot import on_command, on_notice, get_driver
+from nonebot.adapters.onebot.v11 import Bot, Message, GroupMessageEvent, MessageSegment, NoticeEvent
 from nonebot.params import ArgPlainText, CommandArg
+from nonebot.permission import SUPERUSER
 from src.utils import Utils
 from src.cn_module import CNModule
+from src.async_facade import AsyncFacade
+from src.member_names import member_names
+from src.results import render_text
+from src.tracing import tracer
+from src.http_client import http_metrics
 
 utils = Utils()
 cnmodule = CNModule()
+facade = AsyncFacade(utils, cnmodule)
+metrics_path = utils.base_path / "userdata" / "metrics.prom"
+get_driver().on_startup(facade.start)
+get_driver().on_shutdown(facade.aclose)
+
+def export_metrics():
+    """指令阶段耗时与上游 HTTP 统计写入同一个 metrics.prom"""
+    return tracer.export(metrics_path, http_metrics.prometheus())
+
+get_driver().on_shutdown(export_metrics)
 
 bond = on_command("bond", aliases = {"绑定"}, priority = 5)
 cnbond = on_command("cnbond", aliases = {"cn绑定"}, priority = 5)
@@ -18,145 +34,147 @@ sub_bond = on_command("sub_bond", aliases = {"订阅", "subscribe"}, priority =
 ms_info = on_command("ms_info", aliases = {"ms信息", "msi"}, priority = 5)
 update = on_command("update", aliases = {"更新ms数据"}, priority = 5)
 card_info = on_command("card_info", aliases = {"个人图鉴"}, priority = 5)
+member_notice = on_notice(priority = 5, block = False)
+trace_stats = on_command("trace_stats", aliases = {"性能统计"}, permission = SUPERUSER, priority = 5)
+
+@member_notice.handle()
+async def member_notice_handle(event: NoticeEvent):
+    # 群名片变更或退群时丢弃缓存的显示名
+    if event.notice_type in ("group_card", "group_decrease"):
+        member_names.invalidate(getattr(event, "group_id", ""), getattr(event, "user_id", ""))
 
 @bond.handle()
 async def bond_handle(bot: Bot, event: GroupMessageEvent, args: Message = CommandArg()):
     uid = args.extract_plain_text()
     user_id = str(event.user_id)
-    utils.bond_user(user_id, uid)
+    await facade.run(utils.bond_user, user_id, uid)
     await bond.finish("绑定成功！")
 
 @cnbond.handle()
 async def cnbond_handle(bot: Bot, event: GroupMessageEvent, args: Message = CommandArg()):
     uid = args.extract_plain_text()
     user_id = str(event.user_id)
-    cnmodule.bond_user(user_id, uid)
+    await facade.run(cnmodule.bond_user, user_id, uid)
     await cnbond.finish("cn绑定成功！")
 
 @cnms.handle()
+@tracer.command("cnms")
 async def cnms_handle(bot: Bot, event: GroupMessageEvent):
     user_id = str(event.user_id)
-    group_id = str(event.group_id)
-    try:
-        cnmodule.get_user_data(user_id)
-    except Exception as e:
-        await cnms.finish(e.message)
-    
-    user_info = await bot.get_group_member_info(group_id=group_id, user_id=int(user_id))
-    user_name = user_info.get("card") or user_info.get("nickname")
-    material = cnmodule.get_harvest_info(user_id, user_name)
-    messages = ""
-    for item in material:
-        for k, v in item.items():
-            messages = messages + str(k) + ":" + str(v) + "\n"
-    await cnms.finish(messages)
+    async with facade.limit("cnms"):
+        try:
+            await facade.run(cnmodule.get_user_data, user_id)
+        except Exception as e:
+            await cnms.finish(e.message)
+
+        user_name = await member_names.display_name(bot, event)
+        material = await facade.run(cnmodule.get_harvest_info, user_id, user_name)
+    with tracer.span("send"):
+        await cnms.finish(render_text(material))
 
 @cnmsa.handle()
+@tracer.command("cnmsa")
 async def cnmsa_handle(bot: Bot, event: GroupMessageEvent):
     user_id = str(event.user_id)
     if user_id == "794922335":
         user_id = "2376841147"
     group_id = str(event.group_id)
-    try:
-        cnmodule.get_user_data(user_id)
-    except Exception as e:
-        await cnmsa.finish(e.message)
-    
-    cnmodule.msa(user_id)
+    async with facade.limit("cnmsa"):
+        try:
+            await facade.run(cnmodule.get_user_data, user_id)
+        except Exception as e:
+            await cnmsa.finish(e.message)
+
+        map_paths = await facade.msa(user_id)
 
     forward_msg = [
         MessageSegment(
             type="node",
             data={
                 "user_id": user_id,
-                "content": f"[CQ:image,file=file:///home/ubuntu/bot/rin/rin/plugins/gate_helper/output/{user_id}_map_{id}.png]"
+                "content": f"[CQ:image,file=file:///{path}]"
             }
         )
-        for id in range(5, 9)
+        for path in map_paths
     ]
 
-    await bot.send_group_forward_msg(group_id=group_id, messages=forward_msg)
+    with tracer.span("send"):
+        await bot.send_group_forward_msg(group_id=group_id, messages=forward_msg)
 
 @gate_material.handle()
+@tracer.command("gate_material")
 async def gate_material_handle(bot: Bot, event: GroupMessageEvent, args: Message = CommandArg()):
     args_in = args.extract_plain_text()
     unit, _, level = args_in.partition(" ")
     user_id = str(event.user_id)
-    group_id = str(event.group_id)
 
-    try:
-        utils.get_user_data(user_id)
-    except Exception as e:
-        await gate_material.finish(e.message)
+    async with facade.limit("gate_material"):
+        try:
+            await facade.get_user_data(user_id)
+        except Exception as e:
+            await gate_material.finish(e.message)
 
-    try:
-        groupid = utils.get_unit(unit, user_id)
-    except Exception as e:
-        await gate_material.finish(e.message)
+        # /msg all [等级]：一次查询所有团
+        batch = unit in ("all", "全部")
+        if not batch:
+            try:
+                groupid = await facade.run(utils.get_unit, unit, user_id)
+            except Exception as e:
+                await gate_material.finish(e.message)
 
-    if not level:
-        level = 40
-    elif int(level) < 0 or int(level) > 40:
-        await gate_material.finish("指定的等级不存在")
-    else:
-        target_level = int(level)
-    
-    if utils.gate_material_path.exists() and utils.material_path.exists():
-        user_info = await bot.get_group_member_info(group_id=group_id, user_id=int(user_id))
-        user_name = user_info.get("card") or user_info.get("nickname")
-        materials = utils.get_materials_needed(groupid, target_level, user_id, user_name)
-    
-    messages = ""
-    for material_needed, quantity in materials.items():
-        if material_needed == "当前团已满级✨":
-            messages = messages + material_needed + "\n"
-        elif material_needed == "已达到目标等级":
-            messages = messages + material_needed + "\n"
+        if not level:
+            target_level = 40
+        elif int(level) < 0 or int(level) > 40:
+            await gate_material.finish("指定的等级不存在")
         else:
-            messages = messages + material_needed + ":" + str(quantity) + "\n"
-    await gate_material.finish(messages)
+            target_level = int(level)
+
+        if utils.gate_material_path.exists() and utils.material_path.exists():
+            user_name = await member_names.display_name(bot, event)
+            if batch:
+                materials = await facade.run(utils.get_materials_needed_all, target_level, user_id, user_name)
+            else:
+                materials = await facade.run(utils.get_materials_needed, groupid, target_level, user_id, user_name)
+
+    with tracer.span("send"):
+        await gate_material.finish(render_text(materials))
 
 @blueprint_obt.handle()
+@tracer.command("blueprint_obt")
 async def blueprint_obt_handle(bot: Bot, event: GroupMessageEvent, args: Message = CommandArg()):
     args_in = args.extract_plain_text()
 
     user_id = str(event.user_id)
-    group_id = str(event.group_id)
 
-    if not args_in:
-        number = 10
-    elif int(args_in) >20:
-        number = 20
-        await bot.send_group_msg(group_id = event.group_id, message = "显示数量过大，已限制为20")
-    elif int(args_in) < 1:
-        number = 10
-        await bot.send_group_msg(group_id = event.group_id, message = "查询数量过小，采用默认查询数量")
-    else:
-        number = int(args_in)
+    # /msbp [页码] [分类或家具类型id]
+    tokens = args_in.split()
+    page = 1
+    category = None
+    genre = None
+    if tokens and tokens[0].isdigit():
+        page = int(tokens.pop(0))
+    if tokens:
+        if tokens[0].isdigit():
+            genre = int(tokens[0])
+        else:
+            category = tokens[0]
 
-    try:
-        utils.get_user_ms_data(user_id)
-    except Exception as e:
-        await blueprint_obt.finish(e.message)
+    async with facade.limit("blueprint_obt"):
+        try:
+            await facade.get_user_ms_data(user_id)
+        except Exception as e:
+            await blueprint_obt.finish(e.message)
 
-    if utils.blueprints_path.exists() and utils.blueprints_map_path.exists():
-        user_info = await bot.get_group_member_info(group_id=group_id, user_id=int(user_id))
-        user_name = user_info.get("card") or user_info.get("nickname")
-        blueprints = utils.get_blueprints_unobtained(number, user_id, user_name)
+        if utils.blueprints_path.exists() and utils.blueprints_map_path.exists():
+            user_name = await member_names.display_name(bot, event)
+            blueprints = await facade.run(utils.get_blurprints_unobtained, 20, user_id, user_name, page, category, genre)
 
-    messages = ""
-    dict_length = len(blueprints)
-    
-    for i, (blueprint, name) in enumerate(blueprints.items()):
-        if i == dict_length - 1:
-            messages = messages + str(blueprint) + str(name)
-        else:
-            messages = messages + str(blueprint) + ":" + str(name) + "\n"
-    await blueprint_obt.finish(messages)
+    with tracer.span("send"):
+        await blueprint_obt.finish(render_text(blueprints))
 
 @sub_bond.handle()
 async def sub_bond_handle(bot: Bot, event: GroupMessageEvent):
-    messages = "请发送你需要订阅的材料id，以空格分割\n材料id列表如下图\n"
+    messages = "请发送你需要订阅的材料id或材料名，以空格分割\n材料id列表如下图\n"
     messages = messages + "[CQ:image,file=file:///home/ubuntu/bot/rin/rin/plugins/gate_helper/userdata/material_id.png]"
     await bot.send_group_msg(group_id = event.group_id, message = messages)
 
@@ -164,72 +182,94 @@ async def sub_bond_handle(bot: Bot, event: GroupMessageEvent):
 async def sub_bond_got_handle(bot: Bot, event: GroupMessageEvent, subs: str = ArgPlainText("subs")):
     user_id = str(event.user_id)
 
-    sub_list = list(map(int, subs.split()))
-    utils.bond_sub(user_id, sub_list)
+    try:
+        sub_list = await facade.run(utils.parse_material_ids, subs)
+    except Exception as e:
+        await sub_bond.finish(e.message)
+    await facade.run(utils.bond_sub, user_id, sub_list)
     await sub_bond.finish("订阅成功！")
 
 @sub_material.handle()
+@tracer.command("sub_material")
 async def sub_material_handle(bot: Bot, event: GroupMessageEvent):
     user_id = str(event.user_id)
-    group_id = str(event.group_id)
 
-    try:
-        utils.get_user_ms_data(user_id)
-    except Exception as e:
-        await sub_material.finish(e.message)
-    try:
-        utils.get_user_sub(user_id)
-    except Exception as e:
-        await sub_material.finish(e.message)
-            
-    user_info = await bot.get_group_member_info(group_id=group_id, user_id=int(user_id))
-    user_name = user_info.get("card") or user_info.get("nickname")
-    harvest = utils.get_harvest_info(user_id, user_name)
-
-    messages = ""
-    for item in harvest:
-        for k, v in item.items():
-            messages = messages + str(k) + ":" + str(v) + "\n"
-    await sub_material.finish(messages)
+    async with facade.limit("sub_material"):
+        try:
+            await facade.get_user_ms_data(user_id)
+        except Exception as e:
+            await sub_material.finish(e.message)
+        try:
+            await facade.run(utils.get_user_sub, user_id)
+        except Exception as e:
+            await sub_material.finish(e.message)
+
+        user_name = await member_names.display_name(bot, event)
+        harvest = await facade.run(utils.get_harvest_info, user_id, user_name)
+
+    with tracer.span("send"):
+        await sub_material.finish(render_text(harvest))
 
 @ms_info.handle()
+@tracer.command("ms_info")
 async def ms_info_handle(bot: Bot, event: GroupMessageEvent):
     user_id = str(event.user_id)
-    group_id = str(event.group_id)
 
-    try:
-        utils.get_user_ms_data(user_id)
-    except Exception as e:
-        await ms_info.finish(e.message)
-    
-    if utils.weather_path.exists():
-        user_info = await bot.get_group_member_info(group_id=group_id, user_id=int(user_id))
-        user_name = user_info.get("card") or user_info.get("nickname")
-        mysekai_info = utils.get_ms_info(user_id, user_name)
-    
-    messages = ""
-    for key, value in mysekai_info.items():
-        messages = messages + str(key) + ":" + str(value) + "\n"
-    await ms_info.finish(messages)
+    async with facade.limit("ms_info"):
+        try:
+            await facade.get_user_ms_data(user_id)
+        except Exception as e:
+            await ms_info.finish(e.message)
+
+        if utils.weather_path.exists():
+            user_name = await member_names.display_name(bot, event)
+            mysekai_info = await facade.run(utils.get_ms_info, user_id, user_name)
+
+    with tracer.span("send"):
+        await ms_info.finish(render_text(mysekai_info))
 
 @update.handle()
+@tracer.command("update")
 async def update_handle(bot: Bot, event: GroupMessageEvent):
     try:
-        utils.data_update()
+        async with facade.limit("update"):
+            results = await facade.data_update()
     except Exception as e:
         await update.finish(e.message)
     else:
-        await update.finish("更新成功！")
+        status_name = {"updated": "已更新", "unchanged": "无变化"}
+        lines = ["更新成功！"]
+        lines.extend(
+            f"{result.name}:{status_name.get(result.status, result.status)} {result.elapsed:.2f}s {result.size}B"
+            for result in results
+        )
+        await update.finish("\n".join(lines))
     
 @card_info.handle()
+@tracer.command("card_info")
 async def card_info_handle(bot: Bot, event: GroupMessageEvent):
     user_id = str(event.user_id)
 
-    try:
-        utils.get_user_data(user_id)
-    except Exception as e:
-        await card_info.finish(e.message)
+    async with facade.limit("card_info"):
+        try:
+            await facade.get_user_data(user_id)
+        except Exception as e:
+            await card_info.finish(e.message)
 
-    pic_path = utils.generate_card_pic(user_id)
+        pic_path = await facade.run(utils.generate_card_pic, user_id)
     msg = f"[CQ:image,file=file:///{pic_path}]"
-    await bot.send_group_msg(group_id = event.group_id, message = msg)
\ No newline at end of file
+    with tracer.span("send"):
+        await bot.send_group_msg(group_id = event.group_id, message = msg)
+
+@trace_stats.handle()
+async def trace_stats_handle(bot: Bot, event: GroupMessageEvent):
+    lines = ["指令/阶段 次数 p50 p95 p99 (ms)"]
+    for command, stage, count, (p50, p95, p99) in tracer.summary():
+        lines.append(f"{command}/{stage} {count} {p50 * 1000:.0f} {p95 * 1000:.0f} {p99 * 1000:.0f}")
+    lines.append("主机 次数 错误 平均/最大 (ms) 状态码")
+    for host, count, errors, mean, peak, status in http_metrics.summary():
+        codes = " ".join(f"{code}:{n}" for code, n in sorted(status.items()))
+        lines.append(f"{host} {count} {errors} {mean * 1000:.0f}/{peak * 1000:.0f} {codes}")
+    path = await facade.run(export_metrics)
+    lines.append(f"已导出到 {path}")
+    await trace_stats.finish("\n".join(lines))
@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from .exception import FileDownloadError
+from .http_client import AsyncHttpClient, http_metrics
+from .fileio import AtomicWriter
+from .upload_parser import UserUpload
+from .utils import Utils
+from .cn_module import CNModule
+from .msa_class import start_render_pool, shutdown_render_pool
+from .tracing import tracer
+
+class AsyncFacade:
+    """Utils / CNModule 的异步门面：网络请求走异步客户端，磁盘与绘图放入线程池"""
+
+    # 每类指令的并发上限
+    DEFAULT_LIMITS = {
+        "gate_material": 8,
+        "blueprint_obt": 8,
+        "sub_material": 8,
+        "ms_info": 8,
+        "card_info": 4,
+        "cnms": 8,
+        "cnmsa": 2,
+        "update": 1,
+    }
+
+    # 下载时每累计这么多字节写一次磁盘
+    WRITE_BATCH = 1024 * 1024
+
+    def __init__(
+        self,
+        utils: Utils,
+        cnmodule: CNModule,
+        max_workers: int = 8,
+        limits: Optional[Dict[str, int]] = None,
+        timeout: float = 30
+    ):
+        self.utils = utils
+        self.cnmodule = cnmodule
+        self.limits = dict(self.DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = "gate_helper")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.http = AsyncHttpClient(timeout = timeout, metrics = http_metrics)
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+    def limit(self, command: str) -> asyncio.Semaphore:
+        """指令类型对应的信号量，用法：async with facade.limit("gate_material")"""
+        semaphore = self._semaphores.get(command)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limits.get(command, 4))
+            self._semaphores[command] = semaphore
+        return semaphore
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在线程池中执行同步方法"""
+        loop = asyncio.get_running_loop()
+        # 复制上下文，线程中的 tracer.span 仍归属当前指令
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, partial(context.run, func, *args, **kwargs))
+
+    async def _download(self, user_id: str, kind: str) -> UserUpload:
+        with tracer.span("fetch"):
+            return await self._fetch(user_id, kind)
+
+    async def _fetch(self, user_id: str, kind: str) -> UserUpload:
+        path = self.utils.user_data_path(user_id, kind)
+        key = (kind, user_id)
+        freshness = self.utils.freshness
+        uid = await self.run(self.utils.get_uid, user_id)
+        headers = freshness.conditional_headers(key, path)
+        try:
+            async with self.http.stream(self.utils.user_data_url(uid, kind), headers = headers) as response:
+                if response.status_code == 304:
+                    freshness.touch(key)
+                    return await self.run(self.utils.uploads.load, path)
+                self.utils.check_user_response(response.status_code, kind)
+                # 原始字节直接写入临时文件，不做 json 往返；磁盘写入按批放入线程池
+                writer = await self.run(AtomicWriter, path)
+                try:
+                    batch = []
+                    batch_size = 0
+                    async for chunk in response.aiter_bytes(65536):
+                        batch.append(chunk)
+                        batch_size += len(chunk)
+                        if batch_size >= self.WRITE_BATCH:
+                            await self.run(writer.write_chunks, batch)
+                            batch = []
+                            batch_size = 0
+                    await self.run(writer.write_chunks, batch)
+                except BaseException:
+                    await self.run(writer.abort)
+                    raise
+        except httpx.HTTPError:
+            raise FileDownloadError(self.utils.USER_DATA[kind][2])
+        upload = await self.run(self.utils.commit_user_data, writer, kind)
+        freshness.record(key, response.headers, upload.upload_time)
+        return upload
+
+    async def fetch_user_data(self, user_id: str, kind: str) -> UserUpload:
+        """TTL 内直接使用本地数据；同一用户的并发请求合并为一次下载"""
+        path = self.utils.user_data_path(user_id, kind)
+        key = (kind, user_id)
+        if self.utils.freshness.is_fresh(key, path):
+            return await self.run(self.utils.uploads.load, path)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._download(user_id, kind))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield：某个等待者被取消时不影响其他人
+        return await asyncio.shield(task)
+
+    async def get_user_data(self, user_id: str) -> UserUpload:
+        return await self.fetch_user_data(user_id, "suite")
+
+    async def get_user_ms_data(self, user_id: str) -> UserUpload:
+        return await self.fetch_user_data(user_id, "mysekai")
+
+    async def data_update(self) -> list:
+        return await self.run(self.utils.data_update)
+
+    async def msa(self, user_id: str) -> Any:
+        return await self.run(self.cnmodule.msa, user_id)
+
+    async def start(self) -> None:
+        """驱动启动时在主线程调用：线程池产生线程之前预先 fork 渲染进程"""
+        start_render_pool(self.cnmodule.render_workers)
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+        self.executor.shutdown(wait = False)
+        shutdown_render_pool()
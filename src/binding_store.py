@@ -0,0 +1,191 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+class BindingStore:
+    """用户绑定与订阅存储：SQLite WAL，按 QQ 号主键查询"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS bindings (
+        server TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        uid TEXT NOT NULL,
+        PRIMARY KEY (server, user_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS subscriptions (
+        user_id TEXT PRIMARY KEY,
+        material_ids TEXT NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS subscribers (
+        material_id INTEGER NOT NULL,
+        user_id TEXT NOT NULL,
+        PRIMARY KEY (material_id, user_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS subscribers_user ON subscribers (user_id);
+    CREATE TABLE IF NOT EXISTS migrations (
+        source TEXT PRIMARY KEY,
+        migrated_at INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    """
+
+    # 旧版 JSON 文件 -> 对应的服务器（None 表示订阅）
+    LEGACY_FILES = {
+        "bond.json": "jp",
+        "cnbond.json": "cn",
+        "usersubs.json": None,
+    }
+
+    # subscribers 倒排表的建立标记，旧库首次打开时从 subscriptions 回填
+    SUBSCRIBERS_INDEX = "subscribers_index"
+
+    # IN (...) 每批的参数个数，低于旧版 SQLite 的 999 上限
+    QUERY_BATCH = 500
+
+    def __init__(self, db_path: Path, legacy_folder: Optional[Path] = None):
+        self.db_path = Path(db_path)
+        self.legacy_folder = Path(legacy_folder) if legacy_folder is not None else self.db_path.parent
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        self.db_path.parent.mkdir(parents = True, exist_ok = True)
+        conn = sqlite3.connect(self.db_path, timeout = 30, isolation_level = None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(self.SCHEMA)
+                self.migrate_legacy(conn)
+                self._build_subscribers(conn)
+                self._initialized = True
+        return conn
+
+    def migrate_legacy(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """一次性导入旧版 list-of-dict JSON 文件，已导入的文件不会重复导入"""
+        conn = conn or self._connect()
+        count = 0
+        for file_name, server in self.LEGACY_FILES.items():
+            path = self.legacy_folder / file_name
+            if not path.exists():
+                continue
+            with open(path, "r", encoding = "utf-8") as f:
+                data = json.load(f)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM migrations WHERE source = ?", (file_name,)).fetchone():
+                    conn.execute("ROLLBACK")
+                    continue
+                for item in data:
+                    for user_id, value in item.items():
+                        if server is None:
+                            inserted = conn.execute(
+                                "INSERT OR IGNORE INTO subscriptions (user_id, material_ids) VALUES (?, ?)",
+                                (str(user_id), json.dumps(value))
+                            ).rowcount
+                            if inserted:
+                                self._index_subs(conn, str(user_id), value)
+                        else:
+                            conn.execute(
+                                "INSERT OR IGNORE INTO bindings (server, user_id, uid) VALUES (?, ?, ?)",
+                                (server, str(user_id), str(value))
+                            )
+                        count += 1
+                conn.execute("INSERT INTO migrations (source, migrated_at) VALUES (?, ?)", (file_name, int(time.time())))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def _build_subscribers(self, conn: sqlite3.Connection) -> None:
+        """为升级前已有的订阅建立倒排表，只执行一次"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM migrations WHERE source = ?", (self.SUBSCRIBERS_INDEX,)).fetchone():
+                conn.execute("ROLLBACK")
+                return
+            for user_id, material_ids in conn.execute("SELECT user_id, material_ids FROM subscriptions").fetchall():
+                self._index_subs(conn, user_id, json.loads(material_ids))
+            conn.execute(
+                "INSERT INTO migrations (source, migrated_at) VALUES (?, ?)",
+                (self.SUBSCRIBERS_INDEX, int(time.time()))
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _index_subs(conn: sqlite3.Connection, user_id: str, material_ids: Iterable[int]) -> None:
+        conn.execute("DELETE FROM subscribers WHERE user_id = ?", (user_id,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO subscribers (material_id, user_id) VALUES (?, ?)",
+            [(int(material_id), user_id) for material_id in material_ids]
+        )
+
+    def set_uid(self, server: str, user_id: str, uid: str) -> None:
+        self._connect().execute(
+            "INSERT INTO bindings (server, user_id, uid) VALUES (?, ?, ?) "
+            "ON CONFLICT (server, user_id) DO UPDATE SET uid = excluded.uid",
+            (server, user_id, uid)
+        )
+
+    def get_uid(self, server: str, user_id: str) -> Optional[str]:
+        row = self._connect().execute(
+            "SELECT uid FROM bindings WHERE server = ? AND user_id = ?", (server, user_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_subs(self, user_id: str, material_ids: List[int]) -> None:
+        """保存订阅并在同一事务中更新 material_id -> user_id 倒排表"""
+        material_ids = list(material_ids)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO subscriptions (user_id, material_ids) VALUES (?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET material_ids = excluded.material_ids",
+                (user_id, json.dumps(material_ids))
+            )
+            self._index_subs(conn, user_id, material_ids)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_subs(self, user_id: str) -> Optional[List[int]]:
+        row = self._connect().execute(
+            "SELECT material_ids FROM subscriptions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_subscribers(self, material_id: int) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT user_id FROM subscribers WHERE material_id = ?", (int(material_id),)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def subscribers_of(self, material_ids: Iterable[int]) -> Dict[str, List[int]]:
+        """user_id -> 该用户订阅的、出现在 material_ids 中的材料"""
+        material_ids = sorted({int(i) for i in material_ids})
+        conn = self._connect()
+        result: Dict[str, List[int]] = {}
+        for start in range(0, len(material_ids), self.QUERY_BATCH):
+            batch = material_ids[start:start + self.QUERY_BATCH]
+            rows = conn.execute(
+                f"SELECT material_id, user_id FROM subscribers WHERE material_id IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            for material_id, user_id in rows:
+                result.setdefault(user_id, []).append(material_id)
+        return result
+
+binding_store = BindingStore(Path(__file__).parent.parent / "userdata" / "bindings.db")
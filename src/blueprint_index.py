@@ -0,0 +1,66 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .master_data import MasterData
+
+class BlueprintEntry:
+    """蓝图及其对应家具的信息"""
+    __slots__ = ("id", "fixture_id", "name", "category", "genre", "sub_genre", "tag_group")
+
+    def __init__(self, blueprint: Dict, fixture: Optional[Dict]):
+        self.id = blueprint["id"]
+        self.fixture_id = blueprint.get("craftTargetId", blueprint["id"])
+        fixture = fixture or {}
+        self.name = fixture.get("name", "Name not found")
+        self.category = blueprint.get("mysekaiCraftType")
+        self.genre = fixture.get("mysekaiFixtureMainGenreId")
+        self.sub_genre = fixture.get("mysekaiFixtureSubGenreId")
+        self.tag_group = fixture.get("mysekaiFixtureTagGroupId")
+
+class BlueprintIndex:
+    """蓝图 id -> 家具 id -> 名称/分类/类型 的索引"""
+
+    def __init__(self, blueprints: List[Dict], fixtures: Dict[int, Dict]):
+        self.entries: Dict[int, BlueprintEntry] = {}
+        self.by_category: Dict[str, List[int]] = {}
+        self.by_genre: Dict[int, List[int]] = {}
+        for blueprint in blueprints:
+            entry = BlueprintEntry(blueprint, fixtures.get(blueprint.get("craftTargetId", blueprint["id"])))
+            self.entries[entry.id] = entry
+            self.by_category.setdefault(entry.category, []).append(entry.id)
+            self.by_genre.setdefault(entry.genre, []).append(entry.id)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def missing(
+        self,
+        obtained_ids: Iterable[int],
+        category: Optional[str] = None,
+        genre: Optional[int] = None
+    ) -> List[BlueprintEntry]:
+        """未获得的蓝图，可按分类 (mysekaiCraftType) 或家具主类型过滤，保持主数据顺序"""
+        obtained = set(obtained_ids)
+        if category is not None and genre is not None:
+            candidates = [i for i in self.by_category.get(category, []) if self.entries[i].genre == genre]
+        elif category is not None:
+            candidates = self.by_category.get(category, [])
+        elif genre is not None:
+            candidates = self.by_genre.get(genre, [])
+        else:
+            candidates = self.entries
+        return [self.entries[i] for i in candidates if i not in obtained]
+
+    @staticmethod
+    def page(entries: List[BlueprintEntry], page: int, page_size: int) -> Tuple[List[BlueprintEntry], int]:
+        """返回指定页及总页数，页码从 1 开始并截断到有效范围"""
+        pages = max(1, -(-len(entries) // page_size))
+        page = min(max(page, 1), pages)
+        return entries[(page - 1) * page_size:page * page_size], pages
+
+def blueprint_index(master: MasterData) -> BlueprintIndex:
+    """随主数据版本缓存的蓝图索引"""
+    return master.derived(
+        "blueprint_index",
+        ("blueprints", "fixtures"),
+        lambda m: BlueprintIndex(m.load("blueprints"), m.index("fixtures"))
+    )
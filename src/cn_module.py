@@ -1,3 +1,5 @@
+import os
+import uuid
 from pathlib import Path
 import json
 from .exception import FileDownloadError, UserError, NotFoundError
@@ -6,143 +8,98 @@ from PIL import Image, ImageDraw, ImageFont
 from typing import Dict, List, Tuple, Optional
 from collections import defaultdict
 from .msa_class import MapVisualizer, SceneConfig
+from .master_data import master_data
+from .translation import material_translator, MEMORIAL_RANGE
+from .harvest import harvest_matrix, SITE_NAMES
+from .results import UserHeader, HarvestReport, SiteMaterials
+from .binding_store import binding_store
+from .render_cache import RenderCache
+from .upload_cache import upload_cache
+from .tracing import tracer
 
 class CNModule:
     def __init__(self):
         self.base_path = Path(__file__).parent.parent
-        self.bond_path = self.base_path / "userdata" / "cnbond.json"
 
-        self.material_path = self.base_path / "data" / "mysekaiMaterials.json"
+        self.master = master_data
+        self.store = binding_store
+        self.uploads = upload_cache
+        self.render_workers = min(4, os.cpu_count() or 1)
 
-        self.memorial_translate = self.base_path / "data" / "reference.json"
+        self.upload_folder = "/home/ubuntu/bot/json_uploader/uploads"
+        self.render_base = "/home/ubuntu/bot/rin/rin/plugins/gate_helper/"
+        self.output_folder = "/home/ubuntu/bot/rin/rin/plugins/gate_helper/output"
+        self.render_cache = RenderCache(Path(self.output_folder) / "cache")
     
     def bond_user(self, user_id: str, uid: str)-> None:
-        if not self.bond_path.exists():
-            with open(self.bond_path, "w", encoding = "utf-8") as f:
-                json.dump([], f)
-        with open(self.bond_path, "r", encoding = "utf-8") as f:
-            data = json.load(f)
+        self.store.set_uid("cn", user_id, uid)
 
-        updated = False
-        for item in data:
-            if user_id in item:
-                item[user_id] = uid
-                updated = True
-                break
+    def upload_path(self, user_id: str) -> Path:
+        return Path(self.upload_folder) / f"{user_id}_ms.json"
 
-        if not updated:
-            new_record = {user_id : uid}
-            data.append(new_record)
-
-        with open(self.bond_path, "w", encoding = "utf-8") as f:
-            json.dump(data, f, indent = 4)
-    
     def get_user_data(self, user_id: str) -> None:
-        with open(self.bond_path, "r", encoding = "utf-8") as f:
-            data = json.load(f)
-        found = False
-        for item in data:
-            if user_id in item:
-                uid = item[user_id]
-                found = True
-                break
-
-        if not found:
+        if self.store.get_uid("cn", user_id) is None:
             raise UserError("未绑定用户，使用指令[！绑定 uid]进行绑定")
-        
-        # json_path = self.base_path / "data" / f"user_{user_id}_ms.json"
-        json_path = Path("/home/ubuntu/bot/json_uploader") / "uploads" / f"{user_id}_ms.json"
 
-        if not json_path.exists():
+        if not self.upload_path(user_id).exists():
             raise FileDownloadError("未找到用户数据")
     
     def data_translate(self, data: dict) -> dict:
-        with open(self.material_path, "r", encoding = "utf-8") as f:
-            material_map = json.load(f)
-        
-        translated_materials_needed = {}
-        for materialId, quantity in data.items():
-            for item in material_map:
-                if materialId == item["id"] and (materialId < 35 or materialId > 60):
-                    translated_materials_needed[item["name"]] = quantity
-                    break
+        return material_translator(self.master).translate(data)
+    
+    @tracer.timed("compute")
+    def get_harvest_info(self, user_id: str, user_name: str) -> HarvestReport:
+        userdata = self.uploads.load(self.upload_path(user_id))
         
-        with open(self.memorial_translate, "r", encoding = "utf-8") as f:
-            memorial_map = json.load(f)
+        translator = material_translator(self.master)
 
-        for materialId, quantity in data.items():
-            for item in memorial_map["reference"]:
-                if materialId == item["id"] and (materialId >= 35 and materialId <= 60):
-                    translated_materials_needed[item["name"]] = quantity
-                    break
+        update_time = datetime.fromtimestamp(userdata.now/1000).strftime("%Y-%m-%d %H:%M:%S")
+        report = HarvestReport(UserHeader(user_name, user_id, update_time))
 
-        return translated_materials_needed
+        matrix = harvest_matrix(userdata)
+        for map_id in matrix.sites:
+            materials = {}
+            for k, v in matrix.totals(map_id).items():
+                name = translator.name(k)
+                if name and k not in MEMORIAL_RANGE and v != 0:
+                    materials[name] = v
+            report.sites.append(SiteMaterials(map_id, SITE_NAMES.get(map_id, ""), materials))
+                                        
+        return report
     
-    def get_harvest_info(self, user_id: str, user_name: str) -> list:
-        result = []
-        harvest_info = {"用户": user_name + "(" + user_id + ")"}
+    @tracer.timed("render")
+    def msa(self, user_id: str) -> list:
+        json_file = self.upload_path(user_id)
+        maps_data = self.uploads.load(json_file).harvest_maps
 
-        # json_path = self.base_path / "data" / f"user_{user_id}_ms.json"
-        json_path = Path("/home/ubuntu/bot/json_uploader") / "uploads" / f"{user_id}_ms.json"
-        with open(json_path, "r", encoding = "utf-8") as f:
-            userdata = json.load(f)
-        
-        with open(self.material_path, "r", encoding = "utf-8") as f:
-            material_map = json.load(f)
-        
-        update_time = datetime.fromtimestamp(int(userdata["updatedResources"]["now"])/1000).strftime("%Y-%m-%d %H:%M:%S")
-        # now_time = int(datetime.now().timestamp())
-        harvest_info.update({"更新时间": update_time})
-        
-        # if now_time - int(userdata["upload_time"]) > 86400:
-        #     harvest_info.update({"数据过期": "请重新上传数据"})
-        #     result.append(harvest_info)
-        #     return result
-        
-        result.append(harvest_info)
-        
-        # for item in subdata:
-        #     if user_id in item:
-        #         sub_ids = item[user_id]
+        # 命中缓存的地图直接复用，不再构造 MapVisualizer
+        paths = {}
+        keys = {}
+        misses = []
+        for map_data in maps_data:
+            site_id = map_data.get("mysekaiSiteId")
+            if site_id not in MapVisualizer.SCENES:
+                continue
+            keys[site_id] = self.render_cache.key(map_data, MapVisualizer.render_config(site_id, 5, 10))
+            cached = self.render_cache.get(keys[site_id])
+            if cached:
+                paths[site_id] = cached
+            else:
+                misses.append(map_data)
 
-        for item in userdata["updatedResources"]["userMysekaiHarvestMaps"]:
-            material_info = {}
-            map_id = item["mysekaiSiteId"]
-            if map_id == 5:
-                map_name = "さいしょの原っぱ"
-            elif map_id == 6:
-                map_name = "願いの砂浜"
-            elif map_id == 7:
-                map_name = "彩りの花畑"
-            elif map_id == 8:
-                map_name = "忘れ去られた場所"
-            material_info.update({f"图{map_id - 4}：{map_name}": ""})
-            material_dict = {}
-            for fixture in item["userMysekaiSiteHarvestResourceDrops"]:
-                rid = fixture["resourceId"]
-                qty = fixture["quantity"]
+        if misses:
+            # 每次渲染使用唯一的文件名前缀，同一用户的并发请求不会写入同一文件
+            visualizer = MapVisualizer(
+            id=f"{user_id}_{uuid.uuid4().hex}",
+            json_file=str(json_file),                                                   # 原始 API JSON 文件
+            base_folder=self.render_base,                                              # 包含img文件夹的基础目录
+            icon_folder=str(Path(self.render_base) / "icon" / "Texture2D"),            # 图标文件夹
+            output_folder=self.output_folder,                                          # 输出文件夹
+            point_size=5,                          # 资源点大小
+            font_size=10,                          # 数量字体大小
+            workers=self.render_workers            # 并行渲染进程数
+            )
+            for site_id, output_path in visualizer.iter_maps(misses):
+                paths[site_id] = self.render_cache.put(keys[site_id], output_path)
 
-                material_dict[rid] = material_dict.get(rid, 0) + qty
-                # material_dict[fixture["resourceId"]] += fixture["quantity"]
-            
-            for k, v in material_dict.items():
-                for item in material_map:
-                    if k == item["id"] and (k < 35 or k > 60):
-                        if v != 0:
-                            material_info.update({item["name"]: v})
-            result.append(material_info)
-                                        
-        return result
-    
-    def msa(self, user_id: str) -> str:
-        visualizer = MapVisualizer(
-        id=user_id,
-        json_file=f"/home/ubuntu/bot/json_uploader/uploads/{user_id}_ms.json",  # 原始 API JSON 文件
-        base_folder="/home/ubuntu/bot/rin/rin/plugins/gate_helper/",                # 包含img文件夹的基础目录
-        icon_folder="/home/ubuntu/bot/rin/rin/plugins/gate_helper/icon/Texture2D",          # 图标文件夹
-        output_folder="/home/ubuntu/bot/rin/rin/plugins/gate_helper/output",                # 输出文件夹
-        point_size=5,                          # 资源点大小
-        font_size=10                           # 数量字体大小
-        )
-    
-        visualizer.process_all()
\ No newline at end of file
+        return [paths[site_id] for site_id in sorted(paths)]
@@ -0,0 +1,71 @@
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple
+
+class FetchState:
+    """单个用户数据文件的新鲜度信息"""
+    def __init__(
+        self,
+        fetched_at: float,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        upload_time: Optional[int] = None
+    ):
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.upload_time = upload_time
+
+class FreshnessTracker:
+    """记录每个用户数据最近一次下载的时间与校验头，TTL 内不再请求上游"""
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._states: Dict[Tuple[str, str], FetchState] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[FetchState]:
+        return self._states.get(key)
+
+    def is_fresh(self, key: Tuple[str, str], path: Path) -> bool:
+        state = self._states.get(key)
+        return state is not None and time.monotonic() - state.fetched_at < self.ttl and path.exists()
+
+    def conditional_headers(self, key: Tuple[str, str], path: Path) -> Dict[str, str]:
+        """本地文件存在时附带 If-None-Match / If-Modified-Since"""
+        state = self._states.get(key)
+        headers = {}
+        if state is None or not path.exists():
+            return headers
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+        return headers
+
+    def record(self, key: Tuple[str, str], headers: Mapping[str, str], upload_time: Optional[int] = None) -> None:
+        self._states[key] = FetchState(
+            time.monotonic(),
+            headers.get("ETag"),
+            headers.get("Last-Modified"),
+            upload_time
+        )
+
+    def touch(self, key: Tuple[str, str]) -> None:
+        """上游返回 304 时只刷新时间"""
+        state = self._states.get(key)
+        if state is not None:
+            state.fetched_at = time.monotonic()
+
+    def invalidate(self, key: Tuple[str, str]) -> None:
+        self._states.pop(key, None)
+
+    def lock(self, key: Tuple[str, str]) -> threading.Lock:
+        """同一用户同一类型的同步下载串行执行，后到者直接复用结果"""
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
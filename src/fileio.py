@@ -0,0 +1,65 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable
+
+class AtomicWriter:
+    """写入同目录下的临时文件，commit 时原子替换目标文件，读者不会看到写了一半的文件"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents = True, exist_ok = True)
+        fd, self.tmp_name = tempfile.mkstemp(prefix = f".{self.path.name}.", suffix = ".tmp", dir = self.path.parent)
+        self._file = os.fdopen(fd, "wb")
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        if chunk:
+            self._file.write(chunk)
+            self.size += len(chunk)
+
+    def write_chunks(self, chunks: Iterable[bytes]) -> None:
+        for chunk in chunks:
+            self.write(chunk)
+
+    def flush(self) -> None:
+        """刷新缓冲，使临时文件可以被读取校验"""
+        self._file.flush()
+
+    def commit(self) -> int:
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self.tmp_name, self.path)
+        except BaseException:
+            self.abort()
+            raise
+        return self.size
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self.tmp_name)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "AtomicWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """原子写入整段内容"""
+    atomic_write_chunks(path, (data,))
+
+def atomic_write_chunks(path: Path, chunks: Iterable[bytes]) -> int:
+    """逐块原子写入，返回写入的字节数"""
+    with AtomicWriter(path) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer.size
@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .master_data import MasterData
+
+UNIT_GROUPS = (1000, 2000, 3000, 4000, 5000)
+MAX_GATE_LEVEL = 40
+
+class GateCostTable:
+    """大门升级材料的累计消耗表
+
+    cumulative[unit][level] 为该团从 0 级升到 level 级所需的材料向量，
+    列顺序与 material_ids 一致。a 级到 b 级的消耗即 cumulative[b] - cumulative[a]。
+    """
+
+    def __init__(self, gate_material_map: List[Dict], max_level: int = MAX_GATE_LEVEL):
+        self.material_ids = sorted({row["mysekaiMaterialId"] for row in gate_material_map})
+        self.column = {material_id: i for i, material_id in enumerate(self.material_ids)}
+        width = len(self.material_ids)
+
+        levels = [row["groupId"] % 1000 for row in gate_material_map if row["groupId"] // 1000 * 1000 in UNIT_GROUPS]
+        self.max_level = max([max_level] + levels)
+
+        # 每一级单独的消耗
+        per_level = {unit: [[0] * width for _ in range(self.max_level + 1)] for unit in UNIT_GROUPS}
+        for row in gate_material_map:
+            unit = row["groupId"] // 1000 * 1000
+            level = row["groupId"] - unit
+            if unit in per_level and 1 <= level <= self.max_level:
+                per_level[unit][level][self.column[row["mysekaiMaterialId"]]] += row["quantity"]
+
+        # 前缀和
+        self.cumulative: Dict[int, List[List[int]]] = {}
+        for unit, rows in per_level.items():
+            running = [0] * width
+            table = [list(running)]
+            for level in range(1, self.max_level + 1):
+                running = [a + b for a, b in zip(running, rows[level])]
+                table.append(running)
+            self.cumulative[unit] = table
+
+    def between(self, unit: int, from_level: int, to_level: int) -> List[int]:
+        """从 from_level 升到 to_level 所需的材料向量"""
+        if to_level <= from_level:
+            return [0] * len(self.material_ids)
+        high = self.cumulative[unit][min(to_level, self.max_level)]
+        low = self.cumulative[unit][max(from_level, 0)]
+        return [a - b for a, b in zip(high, low)]
+
+    def between_all(self, from_levels: Dict[int, int], to_level: int) -> Dict[int, List[int]]:
+        """多个团同时升到 to_level 所需的材料向量"""
+        return {unit: self.between(unit, level, to_level) for unit, level in from_levels.items()}
+
+    def total(self, vectors: Iterable[List[int]]) -> List[int]:
+        """按列求和"""
+        result = [0] * len(self.material_ids)
+        for vector in vectors:
+            result = [a + b for a, b in zip(result, vector)]
+        return result
+
+    def remaining_all(
+        self,
+        from_levels: Dict[int, int],
+        to_level: int,
+        owned: Optional[List[int]] = None
+    ) -> Tuple[Dict[int, Dict[int, int]], Dict[int, int]]:
+        """各团分别升到 to_level 仍缺少的材料，以及所有团合计仍缺少的材料
+
+        合计先累加各团需求再扣除一次已有材料，已有材料不会被各团重复抵扣。
+        """
+        needed = self.between_all(from_levels, to_level)
+        per_unit = {unit: self.remaining(vector, owned) for unit, vector in needed.items()}
+        return per_unit, self.remaining(self.total(needed.values()), owned)
+
+    def owned_vector(self, owned: Iterable[Dict]) -> List[int]:
+        """将 userMysekaiMaterials 转换为同一列顺序的向量"""
+        vector = [0] * len(self.material_ids)
+        for item in owned:
+            i = self.column.get(item["mysekaiMaterialId"])
+            if i is not None:
+                vector[i] += item["quantity"]
+        return vector
+
+    def remaining(self, needed: List[int], owned: Optional[List[int]] = None) -> Dict[int, int]:
+        """扣除已有材料后仍缺少的部分，返回 {材料id: 数量}"""
+        if owned is None:
+            owned = [0] * len(needed)
+        return {
+            self.material_ids[i]: need - have
+            for i, (need, have) in enumerate(zip(needed, owned))
+            if need - have > 0
+        }
+
+def gate_cost_table(master: MasterData) -> GateCostTable:
+    """随主数据版本缓存的累计消耗表"""
+    return master.derived(
+        "gate_cost_table",
+        ("gate_materials",),
+        lambda m: GateCostTable(m.load("gate_materials"))
+    )
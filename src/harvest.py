@@ -0,0 +1,205 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+MATERIAL = "mysekai_material"
+
+# SiteHarvest.fixture_ids 中表示该位置只有掉落、没有 fixture
+NO_FIXTURE = -1
+
+SITE_NAMES = {
+    5: "さいしょの原っぱ",
+    6: "願いの砂浜",
+    7: "彩りの花畑",
+    8: "忘れ去られた場所",
+}
+
+class SiteHarvest:
+    """单张地图的列式资源点数据
+
+    资源点 i 的坐标、fixture 为 xs[i]、zs[i]、fixture_ids[i]（无 fixture 为 -1），
+    其奖励为打包表中 offsets[i]:offsets[i + 1] 一段：
+    reward_kinds（kinds 的下标）、reward_ids、reward_quantities。
+    同一位置同一资源合并为一行，同一资源点内按资源类型首次出现的顺序分组。
+    """
+
+    def __init__(self, site_id: int):
+        self.site_id = site_id
+        self.kinds: List[str] = []
+        self.xs = array("d")
+        self.zs = array("d")
+        self.fixture_ids = array("q")
+        self.offsets = array("q", [0])
+        self.reward_kinds = array("H")
+        self.reward_ids = array("q")
+        self.reward_quantities = array("q")
+        # (resourceType, resourceId) -> 整张地图的总数
+        self.totals: Dict[Tuple[str, int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def spawned(self) -> Iterator[int]:
+        """有 fixture 的资源点下标，按出现顺序"""
+        return (i for i, fixture_id in enumerate(self.fixture_ids) if fixture_id != NO_FIXTURE)
+
+    def rewards(self, i: int) -> Iterator[Tuple[str, int, int]]:
+        """资源点 i 的 (资源类型, 资源id, 数量)"""
+        kinds = self.kinds
+        for j in range(self.offsets[i], self.offsets[i + 1]):
+            yield kinds[self.reward_kinds[j]], self.reward_ids[j], self.reward_quantities[j]
+
+    def to_points(self) -> List[Dict]:
+        """旧版 [{location, fixtureId, reward}] 格式"""
+        points = []
+        for i in self.spawned():
+            reward: Dict[str, Dict[int, int]] = {}
+            for kind, resource_id, quantity in self.rewards(i):
+                reward.setdefault(kind, {})[resource_id] = quantity
+            points.append({"location": [self.xs[i], self.zs[i]], "fixtureId": self.fixture_ids[i], "reward": reward})
+        return points
+
+def aggregate_site(map_data: Dict) -> SiteHarvest:
+    """一次遍历地图数据，同时得到资源总量和渲染用的列式资源点"""
+    site = SiteHarvest(map_data.get("mysekaiSiteId"))
+    xs, zs, fixture_ids, totals = site.xs, site.zs, site.fixture_ids, site.totals
+    point_index: Dict[Tuple[float, float], int] = {}
+    kind_index: Dict[str, int] = {}
+
+    for fixture in map_data.get("userMysekaiSiteHarvestFixtures", []):
+        if fixture.get("userMysekaiSiteHarvestFixtureStatus") == "spawned":
+            pos = (fixture["positionX"], fixture["positionZ"])
+            i = point_index.get(pos)
+            if i is None:
+                i = point_index[pos] = len(xs)
+                xs.append(pos[0])
+                zs.append(pos[1])
+                fixture_ids.append(fixture["mysekaiSiteHarvestFixtureId"])
+            else:
+                fixture_ids[i] = fixture["mysekaiSiteHarvestFixtureId"]
+
+    # 未打包的奖励行：同一 (资源点, 类型, id) 只占一行
+    cell_index: Dict[Tuple[int, int, int], int] = {}
+    # (资源点, 类型) 首次出现的序号，用于在资源点内按类型分组
+    group_rank: Dict[Tuple[int, int], int] = {}
+    cell_points = array("q")
+    cell_ranks = array("q")
+    cell_kinds = array("H")
+    cell_ids = array("q")
+    cell_quantities = array("q")
+
+    for resource in map_data.get("userMysekaiSiteHarvestResourceDrops", []):
+        kind = resource["resourceType"]
+        resource_id = resource["resourceId"]
+        quantity = resource["quantity"]
+        key = (kind, resource_id)
+        totals[key] = totals.get(key, 0) + quantity
+
+        pos = (resource["positionX"], resource["positionZ"])
+        i = point_index.get(pos)
+        if i is None:
+            i = point_index[pos] = len(xs)
+            xs.append(pos[0])
+            zs.append(pos[1])
+            fixture_ids.append(NO_FIXTURE)
+        k = kind_index.get(kind)
+        if k is None:
+            k = kind_index[kind] = len(site.kinds)
+            site.kinds.append(kind)
+        cell = cell_index.get((i, k, resource_id))
+        if cell is None:
+            cell_index[(i, k, resource_id)] = len(cell_ids)
+            cell_points.append(i)
+            cell_ranks.append(group_rank.setdefault((i, k), len(group_rank)))
+            cell_kinds.append(k)
+            cell_ids.append(resource_id)
+            cell_quantities.append(quantity)
+        else:
+            cell_quantities[cell] += quantity
+
+    # 按资源点打包，资源点内按类型分组，组内保持出现顺序
+    order = sorted(range(len(cell_ids)), key = lambda c: (cell_points[c], cell_ranks[c], c))
+    counts = [0] * len(xs)
+    for c in order:
+        site.reward_kinds.append(cell_kinds[c])
+        site.reward_ids.append(cell_ids[c])
+        site.reward_quantities.append(cell_quantities[c])
+        counts[cell_points[c]] += 1
+    offset = 0
+    for n in counts:
+        offset += n
+        site.offsets.append(offset)
+    return site
+
+class HarvestMatrix:
+    """一次上传中 地图 × 资源 的掉落数量矩阵
+
+    counts[row][col]：sites[row] 地图上 columns[col] = (resourceType, resourceId) 的总数。
+    """
+
+    def __init__(self, harvest_maps: Iterable[Dict]):
+        self.sites: List[int] = []
+        self.row: Dict[int, int] = {}
+        self.columns: List[Tuple[str, int]] = []
+        self.column: Dict[Tuple[str, int], int] = {}
+        self.counts: List[List[int]] = []
+        self.site_data: Dict[int, SiteHarvest] = {}
+
+        for map_data in harvest_maps:
+            site = aggregate_site(map_data)
+            self.site_data[site.site_id] = site
+            self.row[site.site_id] = len(self.sites)
+            self.sites.append(site.site_id)
+            row = [0] * len(self.columns)
+            for key, quantity in site.totals.items():
+                col = self.column.get(key)
+                if col is None:
+                    col = self.column[key] = len(self.columns)
+                    self.columns.append(key)
+                    row.append(0)
+                row[col] += quantity
+            self.counts.append(row)
+
+        # 补齐较早行的列数
+        width = len(self.columns)
+        for row in self.counts:
+            row.extend([0] * (width - len(row)))
+
+    def totals(self, site_id: int, resource_type: str = MATERIAL) -> Dict[int, int]:
+        """某张地图上指定类型资源的非零总量，按该地图中首次出现的顺序"""
+        return {
+            resource_id: quantity
+            for (kind, resource_id), quantity in self.site_data[site_id].totals.items()
+            if kind == resource_type and quantity
+        }
+
+    def select(self, site_id: int, resource_ids: Iterable[int], resource_type: str = MATERIAL) -> Dict[int, int]:
+        """某张地图上给定资源的数量（包括 0），按 resource_ids 顺序"""
+        row = self.counts[self.row[site_id]]
+        result = {}
+        for resource_id in resource_ids:
+            col = self.column.get((resource_type, resource_id))
+            result[resource_id] = row[col] if col is not None else 0
+        return result
+
+    def site(self, site_id: int) -> SiteHarvest:
+        return self.site_data[site_id]
+
+def harvest_matrix(upload) -> HarvestMatrix:
+    """每个 UserUpload 只聚合一次"""
+    if upload.harvest is None:
+        upload.harvest = HarvestMatrix(upload.harvest_maps)
+    return upload.harvest
+
+def subscriber_drops(matrix: HarvestMatrix, store, resource_type: str = MATERIAL) -> Dict[str, Dict[int, Dict[int, int]]]:
+    """一次查询倒排表，得到 user_id -> 地图 -> {订阅材料: 数量}
+
+    只包含至少在一张地图上出现了订阅材料的用户。
+    """
+    spawned = {resource_id for kind, resource_id in matrix.columns if kind == resource_type}
+    result: Dict[str, Dict[int, Dict[int, int]]] = {}
+    for user_id, material_ids in store.subscribers_of(spawned).items():
+        for site_id in matrix.sites:
+            drops = {k: v for k, v in matrix.select(site_id, material_ids, resource_type).items() if v}
+            if drops:
+                result.setdefault(user_id, {})[site_id] = drops
+    return result
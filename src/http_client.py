@@ -0,0 +1,242 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# 可重试的状态码
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+class HttpMetrics:
+    """按主机统计请求次数、状态码与耗时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict] = {}
+
+    def record(self, host: str, status: Optional[int], elapsed: float) -> None:
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = {"count": 0, "errors": 0, "status": {}, "latency_sum": 0.0, "latency_max": 0.0}
+            stats["count"] += 1
+            if status is None:
+                stats["errors"] += 1
+            else:
+                stats["status"][status] = stats["status"].get(status, 0) + 1
+            stats["latency_sum"] += elapsed
+            stats["latency_max"] = max(stats["latency_max"], elapsed)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {host: dict(stats, status = dict(stats["status"])) for host, stats in self._hosts.items()}
+
+    def summary(self) -> List[Tuple[str, int, int, float, float, Dict[int, int]]]:
+        """[(主机, 次数, 连接错误数, 平均秒数, 最大秒数, {状态码: 次数})]，按主机排序"""
+        return [
+            (host, stats["count"], stats["errors"], stats["latency_sum"] / stats["count"], stats["latency_max"], stats["status"])
+            for host, stats in sorted(self.snapshot().items())
+        ]
+
+    def prometheus(self, prefix: str = "gate_helper_http") -> str:
+        """Prometheus 文本格式；连接错误与超时记为 error 状态"""
+        snapshot = sorted(self.snapshot().items())
+        lines = [f"# TYPE {prefix}_requests_total counter"]
+        for host, stats in snapshot:
+            for status, n in sorted(stats["status"].items()):
+                lines.append(f'{prefix}_requests_total{{host="{host}",status="{status}"}} {n}')
+            if stats["errors"]:
+                lines.append(f'{prefix}_requests_total{{host="{host}",status="error"}} {stats["errors"]}')
+        lines.append(f"# TYPE {prefix}_request_seconds summary")
+        for host, stats in snapshot:
+            lines.append(f'{prefix}_request_seconds_sum{{host="{host}"}} {stats["latency_sum"]}')
+            lines.append(f'{prefix}_request_seconds_count{{host="{host}"}} {stats["count"]}')
+        lines.append(f"# TYPE {prefix}_request_seconds_max gauge")
+        for host, stats in snapshot:
+            lines.append(f'{prefix}_request_seconds_max{{host="{host}"}} {stats["latency_max"]}')
+        return "\n".join(lines) + "\n"
+
+class RetryPolicy:
+    """带抖动的指数退避"""
+    def __init__(self, retries: int = 3, backoff: float = 0.5, max_delay: float = 10):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_delay)
+        return min(self.backoff * (2 ** attempt), self.max_delay) * random.uniform(0.5, 1.5)
+
+class HttpClient:
+    """共享的同步 HTTP 客户端：连接池复用、按主机限制并发、超时与重试"""
+
+    def __init__(
+        self,
+        pool_size: int = 16,
+        per_host_limit: int = 6,
+        timeout: tuple = (5, 30),
+        retry: Optional[RetryPolicy] = None,
+        metrics: Optional[HttpMetrics] = None,
+        session: Optional[requests.Session] = None
+    ):
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.metrics = metrics or HttpMetrics()
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_limit(self, host: str) -> threading.BoundedSemaphore:
+        with self._hosts_lock:
+            semaphore = self._hosts.get(host)
+            if semaphore is None:
+                semaphore = self._hosts[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return semaphore
+
+    @staticmethod
+    def _release_on_close(response: requests.Response, semaphore: threading.BoundedSemaphore) -> None:
+        """响应关闭时归还主机并发名额，重复关闭只归还一次"""
+        close = response.close
+        released = False
+
+        def close_and_release():
+            nonlocal released
+            try:
+                close()
+            finally:
+                if not released:
+                    released = True
+                    semaphore.release()
+
+        response.close = close_and_release
+
+    def get(self, url: str, headers: Optional[Mapping[str, str]] = None, stream: bool = False) -> requests.Response:
+        """连接错误、超时与 RETRY_STATUS 会重试；重试耗尽后抛出 requests 异常或返回最后一次响应
+
+        stream=True 时读取响应体期间仍占用主机并发名额，调用方须用 with response: 关闭响应。
+        """
+        host = urlsplit(url).netloc
+        semaphore = self._host_limit(host)
+        attempt = 0
+        while True:
+            semaphore.acquire()
+            # 只计请求本身，不含等待主机并发名额的时间
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, headers = headers, timeout = self.timeout, stream = stream)
+            except (requests.ConnectionError, requests.Timeout):
+                semaphore.release()
+                self.metrics.record(host, None, time.perf_counter() - start)
+                if attempt >= self.retry.retries:
+                    raise
+                time.sleep(self.retry.delay(attempt))
+            except BaseException:
+                semaphore.release()
+                raise
+            else:
+                if stream:
+                    self._release_on_close(response, semaphore)
+                else:
+                    semaphore.release()
+                self.metrics.record(host, response.status_code, time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUS or attempt >= self.retry.retries:
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+                time.sleep(self.retry.delay(attempt, retry_after))
+            attempt += 1
+
+    def close(self) -> None:
+        self.session.close()
+
+class AsyncHttpClient:
+    """异步 HTTP 客户端，重试策略与统计同 HttpClient"""
+
+    def __init__(
+        self,
+        per_host_limit: int = 6,
+        timeout: float = 30,
+        retry: Optional[RetryPolicy] = None,
+        metrics: Optional[HttpMetrics] = None
+    ):
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.metrics = metrics or HttpMetrics()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout = httpx.Timeout(self.timeout, connect = 5),
+                limits = httpx.Limits(max_connections = 32, max_keepalive_connections = 16)
+            )
+        return self._client
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            semaphore = self._hosts[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Mapping[str, str]] = None) -> AsyncIterator[httpx.Response]:
+        """流式 GET，响应体在 async with 结束时关闭，读取响应体期间仍占用主机并发名额"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_limit(host)
+        attempt = 0
+        while True:
+            await semaphore.acquire()
+            start = time.perf_counter()
+            try:
+                response = await self.client.send(self.client.build_request("GET", url, headers = headers), stream = True)
+            except (httpx.ConnectError, httpx.TimeoutException, httpx.RemoteProtocolError):
+                semaphore.release()
+                self.metrics.record(host, None, time.perf_counter() - start)
+                if attempt >= self.retry.retries:
+                    raise
+                await asyncio.sleep(self.retry.delay(attempt))
+            except BaseException:
+                semaphore.release()
+                raise
+            else:
+                self.metrics.record(host, response.status_code, time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUS or attempt >= self.retry.retries:
+                    break
+                retry_after = response.headers.get("Retry-After")
+                try:
+                    await response.aclose()
+                finally:
+                    semaphore.release()
+                await asyncio.sleep(self.retry.delay(attempt, retry_after))
+            attempt += 1
+        try:
+            yield response
+        finally:
+            try:
+                await response.aclose()
+            finally:
+                semaphore.release()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+http_metrics = HttpMetrics()
+http_client = HttpClient(metrics = http_metrics)
@@ -0,0 +1,102 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+class MasterData:
+    """主数据注册表：进程内共享，按文件修改时间失效"""
+
+    FILES = {
+        "gate_materials": "mysekaiGateMaterialGroups.json",
+        "materials": "mysekaiMaterials.json",
+        "blueprints": "mysekaiBlueprints.json",
+        "fixtures": "mysekaiFixtures.json",
+        "phenomenas": "mysekaiPhenomenas.json",
+        "harvest_fixtures": "mysekaiSiteHarvestFixtures.json",
+        "reference": "reference.json",
+    }
+
+    def __init__(self, data_path: Path):
+        self.data_path = Path(data_path)
+        self._lock = threading.RLock()
+        # name -> (mtime_ns, size, data)
+        self._entries: Dict[str, Tuple[int, int, Any]] = {}
+        # name -> (key, token, index)
+        self._indexes: Dict[str, Tuple[str, Tuple, Dict]] = {}
+        # name -> (token, value)
+        self._derived: Dict[str, Tuple[Tuple, Any]] = {}
+
+    def path(self, name: str) -> Path:
+        return self.data_path / self.FILES[name]
+
+    def exists(self, name: str) -> bool:
+        return self.path(name).exists()
+
+    def _stat(self, name: str) -> Tuple[int, int]:
+        st = self.path(name).stat()
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self, name: str) -> Tuple[Tuple[int, int], Any]:
+        """返回 ((mtime, size), 内容)，二者来自同一次读取，不受并发 invalidate 影响"""
+        stamp = self._stat(name)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[:2] == stamp:
+                return stamp, entry[2]
+            with open(self.path(name), "r", encoding = "utf-8") as f:
+                data = json.load(f)
+            self._entries[name] = (stamp[0], stamp[1], data)
+            return stamp, data
+
+    def load(self, name: str) -> Any:
+        """返回解析后的文件内容，仅在文件变化时重新读取"""
+        return self._load(name)[1]
+
+    def token(self, names: Iterable[str]) -> Tuple:
+        """由若干文件的 (mtime, size) 组成的版本标记"""
+        return tuple((name, self._load(name)[0]) for name in names)
+
+    def index(self, name: str, key: str = "id") -> Dict[Any, Dict]:
+        """按 key 建立的字典索引，随文件版本一起失效"""
+        stamp, rows = self._load(name)
+        token = ((name, stamp),)
+        with self._lock:
+            cached = self._indexes.get(name)
+            if cached is not None and cached[0] == key and cached[1] == token:
+                return cached[2]
+            if name == "reference":
+                rows = rows["reference"]
+            index = {row[key]: row for row in rows}
+            self._indexes[name] = (key, token, index)
+            return index
+
+    def get(self, name: str, item_id: Any, default: Optional[Dict] = None) -> Optional[Dict]:
+        return self.index(name).get(item_id, default)
+
+    def derived(self, key: str, names: Iterable[str], builder: Callable[["MasterData"], Any]) -> Any:
+        """缓存由主数据推导出的结构，依赖的任一文件变化后重新构建"""
+        names = tuple(names)
+        token = self.token(names)
+        with self._lock:
+            cached = self._derived.get(key)
+            if cached is not None and cached[0] == token:
+                return cached[1]
+        value = builder(self)
+        with self._lock:
+            self._derived[key] = (token, value)
+        return value
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """丢弃缓存，下次访问时重新加载"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                self._indexes.clear()
+                self._derived.clear()
+            else:
+                self._entries.pop(name, None)
+                self._indexes.pop(name, None)
+                for k in [k for k, (token, _) in self._derived.items() if any(n == name for n, _ in token)]:
+                    del self._derived[k]
+
+master_data = MasterData(Path(__file__).parent.parent / "data")
@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from .exception import FileDownloadError
+from .fileio import atomic_write
+from .http_client import HttpClient, http_client
+from .master_data import MasterData
+
+MASTER_BASE_URL = "https://raw.githubusercontent.com/Team-Haruki/haruki-sekai-master/main/master/"
+
+class RefreshResult:
+    """单个主数据文件的更新结果"""
+    def __init__(
+        self,
+        name: str,
+        status: str,
+        elapsed: float,
+        size: int = 0,
+        error: Optional[str] = None
+    ):
+        self.name = name
+        self.status = status  # updated / unchanged / failed
+        self.elapsed = elapsed
+        self.size = size
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f"RefreshResult({self.name!r}, {self.status!r}, {self.elapsed:.3f}s, {self.size}B)"
+
+class MasterRefresher:
+    """主数据并发条件更新"""
+
+    # 需要从上游下载的主数据及下载失败时的提示
+    SOURCES = {
+        "gate_materials": "升级材料下载失败，若多次重试仍然失败，请使用反馈功能反馈",
+        "materials": "材料映射下载失败，若多次重试仍然失败，请使用反馈功能反馈",
+        "blueprints": "蓝图信息下载失败，若多次重试仍然失败，请使用反馈功能反馈",
+        "fixtures": "蓝图映射下载失败，若多次重试仍然失败，请使用反馈功能反馈",
+        "phenomenas": "天气映射下载失败，若多次重试仍然失败，请使用反馈功能反馈",
+        "harvest_fixtures": "地图材料信息下载失败，若多次重试仍然失败，请使用反馈功能反馈",
+    }
+
+    def __init__(
+        self,
+        master: MasterData,
+        base_url: str = MASTER_BASE_URL,
+        http: Optional[HttpClient] = None,
+        max_workers: int = 6
+    ):
+        self.master = master
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.max_workers = max_workers
+        self.http = http or http_client
+        self.meta_path = master.data_path / ".master_meta.json"
+        self._meta_lock = threading.Lock()
+
+    def _load_meta(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.meta_path, "r", encoding = "utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_meta(self, meta: Dict[str, Dict[str, str]]) -> None:
+        atomic_write(self.meta_path, json.dumps(meta, ensure_ascii = False).encode("utf-8"))
+
+    def _fetch(self, name: str, validators: Dict[str, str]) -> Tuple[RefreshResult, Optional[Dict[str, str]]]:
+        file_name = self.master.FILES[name]
+        path = self.master.path(name)
+        headers = {}
+        # 本地文件缺失时不能依赖 304
+        if path.exists():
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        start = time.perf_counter()
+        try:
+            response = self.http.get(self.base_url + file_name, headers = headers)
+        except requests.RequestException as e:
+            return RefreshResult(name, "failed", time.perf_counter() - start, error = str(e)), None
+
+        if response.status_code == 304:
+            return RefreshResult(name, "unchanged", time.perf_counter() - start), validators
+        if response.status_code != 200:
+            return RefreshResult(name, "failed", time.perf_counter() - start, error = f"HTTP {response.status_code}"), None
+
+        content = response.content
+        try:
+            json.loads(content)
+        except ValueError as e:
+            return RefreshResult(name, "failed", time.perf_counter() - start, len(content), str(e)), None
+        atomic_write(path, content)
+
+        new_validators = {}
+        if response.headers.get("ETag"):
+            new_validators["etag"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            new_validators["last_modified"] = response.headers["Last-Modified"]
+        return RefreshResult(name, "updated", time.perf_counter() - start, len(content)), new_validators
+
+    def refresh(self, names: Optional[Iterable[str]] = None) -> List[RefreshResult]:
+        """并发下载主数据，未变化的文件跳过；任一文件失败时抛出 FileDownloadError"""
+        names = list(self.SOURCES) if names is None else list(names)
+        with self._meta_lock:
+            meta = self._load_meta()
+
+        with ThreadPoolExecutor(max_workers = min(self.max_workers, len(names)) or 1) as executor:
+            futures = [executor.submit(self._fetch, name, meta.get(self.master.FILES[name], {})) for name in names]
+            outcomes = [future.result() for future in futures]
+
+        with self._meta_lock:
+            meta = self._load_meta()
+            for result, validators in outcomes:
+                if validators is not None:
+                    meta[self.master.FILES[result.name]] = validators
+            self._save_meta(meta)
+
+        for result, _ in outcomes:
+            if result.status != "unchanged":
+                self.master.invalidate(result.name)
+
+        results = [result for result, _ in outcomes]
+        for result in results:
+            if result.status == "failed":
+                raise FileDownloadError(self.SOURCES[result.name])
+        return results
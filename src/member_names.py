@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from .tracing import tracer
+
+class MemberNameCache:
+    """(群号, QQ 号) -> 群名片或昵称 的 TTL + LRU 缓存
+
+    消息事件自带的 sender 信息会直接写入缓存；只有缓存缺失或过期时才调用
+    get_group_member_info。群名片变更、退群通知到达时使对应条目失效。
+    """
+
+    def __init__(self, ttl: float = 600, max_entries: int = 4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (group_id, user_id) -> (写入时间, 显示名)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+
+    def get(self, group_id: str, user_id: str) -> Optional[str]:
+        key = (str(group_id), str(user_id))
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, group_id: str, user_id: str, name: str) -> None:
+        key = (str(group_id), str(user_id))
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic(), name)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last = False)
+
+    def invalidate(self, group_id: str, user_id: str) -> None:
+        self._entries.pop((str(group_id), str(user_id)), None)
+
+    async def display_name(self, bot: Any, event: Any) -> str:
+        """群消息事件发送者的显示名"""
+        group_id = str(event.group_id)
+        user_id = str(event.user_id)
+        sender = getattr(event, "sender", None)
+        name = sender and (sender.card or sender.nickname)
+        if name:
+            self.put(group_id, user_id, name)
+            return name
+
+        name = self.get(group_id, user_id)
+        if name is not None:
+            return name
+
+        try:
+            with tracer.span("member_info"):
+                user_info = await bot.get_group_member_info(group_id = int(group_id), user_id = int(user_id))
+        except Exception:
+            # 接口失败时退回过期的缓存
+            entry = self._entries.get((group_id, user_id))
+            if entry is not None:
+                return entry[1]
+            raise
+        name = user_info.get("card") or user_info.get("nickname")
+        self.put(group_id, user_id, name)
+        return name
+
+member_names = MemberNameCache()
@@ -1,8 +1,43 @@
 import json
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
-from typing import Dict, List, Tuple, Optional
-from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+from .harvest import aggregate_site
+from .tracing import tracer
+
+# 图标缓存：(图标目录, 资源类型, 资源ID, 尺寸) -> 缩放后的 RGBA 图标，缺失时为 None
+_ICON_CACHE: Dict[Tuple[str, str, int, int], Optional[Image.Image]] = {}
+_ICON_CACHE_LOCK = threading.Lock()
+
+# 背景图缓存：路径 -> (mtime_ns, 解码后的 RGBA 模板)
+_BACKGROUND_CACHE: Dict[str, Tuple[int, Image.Image]] = {}
+
+def load_background(path: Path) -> Image.Image:
+    """返回解码后的背景模板，调用方需 copy() 后再绘制"""
+    key = str(path)
+    mtime = path.stat().st_mtime_ns
+    cached = _BACKGROUND_CACHE.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    template = Image.open(path).convert('RGBA')
+    _BACKGROUND_CACHE[key] = (mtime, template)
+    return template
+
+@lru_cache(maxsize=None)
+def load_font(font_size: int) -> ImageFont.ImageFont:
+    """每个字号只解析一次字体"""
+    try:
+        return ImageFont.truetype("arial.ttf", font_size)
+    except:
+        try:
+            return ImageFont.truetype("/System/Library/Fonts/PingFang.ttc", font_size)
+        except:
+            return ImageFont.load_default()
 
 class SceneConfig:
     """场景配置类"""
@@ -29,6 +64,9 @@ class SceneConfig:
 class MapVisualizer:
     """地图可视化工具"""
     
+    # 渲染逻辑变化时递增，使已缓存的图片失效
+    RENDERER_VERSION = 1
+    
     # 场景ID映射到名称
     SITE_ID_TO_NAME = {
         1: "マイホーム",
@@ -103,6 +141,27 @@ class MapVisualizer:
         7001: (165, 217, 255),
     }
     
+    # 图标文件名映射
+    ICON_MAPPINGS = {
+        'mysekai_material': {
+            1: 'item_wood_1.png', 2: 'item_wood_2.png', 3: 'item_wood_3.png',
+            4: 'item_wood_4.png', 5: 'item_wood_5.png', 6: 'item_mineral_1.png',
+            7: 'item_mineral_2.png', 8: 'item_mineral_3.png', 9: 'item_mineral_4.png',
+            10: 'item_mineral_5.png', 11: 'item_mineral_6.png', 12: 'item_mineral_7.png',
+            13: 'item_junk_1.png', 14: 'item_junk_2.png', 15: 'item_junk_3.png',
+            16: 'item_junk_4.png', 17: 'item_junk_5.png', 18: 'item_junk_6.png',
+            19: 'item_junk_7.png', 20: 'item_plant_1.png', 21: 'item_plant_2.png',
+            22: 'item_plant_3.png', 23: 'item_plant_4.png', 24: 'item_tone_8.png',
+            32: 'item_junk_8.png', 33: 'item_mineral_8.png', 34: 'item_junk_9.png',
+            61: 'item_junk_10.png', 62: 'item_junk_11.png', 63: 'item_junk_12.png',
+            64: 'item_mineral_9.png', 65: 'item_mineral_10.png',
+        },
+        'mysekai_item': {
+            7: 'item_blueprint_fragment.png',
+        },
+        'mysekai_music_record': 'item_surplus_music_record.png',
+    }
+    
     def __init__(
         self,
         id: str,
@@ -111,8 +170,14 @@ class MapVisualizer:
         icon_folder: str = "icon/Texture2D",
         output_folder: str = "output",
         point_size: int = 5,
-        font_size: int = 10
+        font_size: int = 10,
+        workers: int = 1
     ):
+        self._init_args = {
+            "id": id, "json_file": str(json_file), "base_folder": str(base_folder),
+            "icon_folder": str(icon_folder), "output_folder": str(output_folder),
+            "point_size": point_size, "font_size": font_size,
+        }
         self.id = id
         self.json_file = Path(json_file)
         self.base_folder = Path(base_folder)
@@ -120,56 +185,19 @@ class MapVisualizer:
         self.output_folder = Path(output_folder)
         self.point_size = point_size
         self.font_size = font_size
+        self.workers = workers
         
         self.output_folder.mkdir(exist_ok=True, parents=True)
         
         # 加载字体
-        try:
-            self.font = ImageFont.truetype("arial.ttf", font_size)
-        except:
-            try:
-                self.font = ImageFont.truetype("/System/Library/Fonts/PingFang.ttc", font_size)
-            except:
-                self.font = ImageFont.load_default()
+        self.font = load_font(font_size)
     
     def parse_raw_map_data(self, map_data: Dict) -> List[Dict]:
         """
         将原始 API 数据转换为处理格式
         合并同一位置的 fixture 和 resources
         """
-        fixtures = map_data.get("userMysekaiSiteHarvestFixtures", [])
-        resources = map_data.get("userMysekaiSiteHarvestResourceDrops", [])
-        
-        # 按位置分组资源
-        location_map = defaultdict(lambda: {"fixture_id": None, "rewards": defaultdict(lambda: defaultdict(int))})
-        
-        # 处理 fixtures
-        for fixture in fixtures:
-            if fixture.get("userMysekaiSiteHarvestFixtureStatus") == "spawned":
-                pos = (fixture["positionX"], fixture["positionZ"])
-                location_map[pos]["fixture_id"] = fixture["mysekaiSiteHarvestFixtureId"]
-        
-        # 处理 resources
-        for resource in resources:
-            pos = (resource["positionX"], resource["positionZ"])
-            resource_type = resource["resourceType"]
-            resource_id = resource["resourceId"]
-            quantity = resource["quantity"]
-            
-            # 累加同一位置同一类型同一ID的资源
-            location_map[pos]["rewards"][resource_type][resource_id] += quantity
-        
-        # 转换为列表格式
-        result = []
-        for (x, z), data in location_map.items():
-            if data["fixture_id"] is not None:  # 只处理有 fixture 的位置
-                result.append({
-                    "location": [x, z],
-                    "fixtureId": data["fixture_id"],
-                    "reward": dict(data["rewards"])  # 转换为普通字典
-                })
-        
-        return result
+        return aggregate_site(map_data).to_points()
     
     def game_to_pixel(
         self, 
@@ -202,51 +230,45 @@ class MapVisualizer:
         return int(display_x), int(display_y)
     
     def load_icon(self, resource_type: str, resource_id: int, size: int = 20) -> Optional[Image.Image]:
-        """加载资源图标"""
-        # 图标文件名映射
-        icon_mappings = {
-            'mysekai_material': {
-                1: 'item_wood_1.png', 2: 'item_wood_2.png', 3: 'item_wood_3.png',
-                4: 'item_wood_4.png', 5: 'item_wood_5.png', 6: 'item_mineral_1.png',
-                7: 'item_mineral_2.png', 8: 'item_mineral_3.png', 9: 'item_mineral_4.png',
-                10: 'item_mineral_5.png', 11: 'item_mineral_6.png', 12: 'item_mineral_7.png',
-                13: 'item_junk_1.png', 14: 'item_junk_2.png', 15: 'item_junk_3.png',
-                16: 'item_junk_4.png', 17: 'item_junk_5.png', 18: 'item_junk_6.png',
-                19: 'item_junk_7.png', 20: 'item_plant_1.png', 21: 'item_plant_2.png',
-                22: 'item_plant_3.png', 23: 'item_plant_4.png', 24: 'item_tone_8.png',
-                32: 'item_junk_8.png', 33: 'item_mineral_8.png', 34: 'item_junk_9.png',
-                61: 'item_junk_10.png', 62: 'item_junk_11.png', 63: 'item_junk_12.png',
-                64: 'item_mineral_9.png', 65: 'item_mineral_10.png',
-            },
-            'mysekai_item': {
-                7: 'item_blueprint_fragment.png',
-            },
-            'mysekai_music_record': 'item_surplus_music_record.png',
-        }
-        
+        """加载资源图标（进程内缓存，所有实例共享）"""
+        key = (str(self.icon_folder), resource_type, resource_id, size)
+        if key in _ICON_CACHE:
+            return _ICON_CACHE[key]
+
         icon_name = None
         if resource_type == 'mysekai_music_record':
-            icon_name = icon_mappings['mysekai_music_record']
-        elif resource_type in icon_mappings and resource_id in icon_mappings[resource_type]:
-            icon_name = icon_mappings[resource_type][resource_id]
-        
+            icon_name = self.ICON_MAPPINGS['mysekai_music_record']
+        elif resource_type in self.ICON_MAPPINGS and resource_id in self.ICON_MAPPINGS[resource_type]:
+            icon_name = self.ICON_MAPPINGS[resource_type][resource_id]
+
+        icon = None
         if icon_name:
             icon_path = self.icon_folder / icon_name
             if icon_path.exists():
                 icon = Image.open(icon_path).convert('RGBA')
                 icon = icon.resize((size, size), Image.Resampling.LANCZOS)
-                return icon
-        
-        return None
+
+        with _ICON_CACHE_LOCK:
+            _ICON_CACHE.setdefault(key, icon)
+        return _ICON_CACHE[key]
+
+    def preload_icons(self, size: int = 20):
+        """预先解码并缩放全部图标"""
+        for resource_type, mapping in self.ICON_MAPPINGS.items():
+            if isinstance(mapping, dict):
+                for resource_id in mapping:
+                    self.load_icon(resource_type, resource_id, size)
+            else:
+                self.load_icon(resource_type, 0, size)
     
     def draw_point_with_rewards(
         self,
-        draw: ImageDraw.Draw,
         background: Image.Image,
+        draw: ImageDraw.Draw,
         x: int,
         y: int,
         fixture_id: int,
-        reward: Dict,
+        reward: Iterable[Tuple[str, int, int]],
         scene: SceneConfig
     ):
         """绘制资源点和奖励"""
@@ -263,7 +285,7 @@ class MapVisualizer:
         )
         
         # 绘制奖励图标
-        self.draw_rewards(background, x, y, reward, scene)
+        self.draw_rewards(background, draw, x, y, reward, scene)
     
     def create_missing_icon(self, size: int = 20) -> Image.Image:
         """创建缺失图标的占位图"""
@@ -283,22 +305,26 @@ class MapVisualizer:
     def draw_rewards(
         self,
         background: Image.Image,
+        draw: ImageDraw.Draw,
         x: int,
         y: int,
-        reward: Dict,
+        reward: Iterable[Tuple[str, int, int]],
         scene: SceneConfig
     ):
-        """绘制奖励物品列表"""
+        """绘制奖励物品列表
+
+        半透明底板只与其覆盖的矩形区域合成，而不是每个点都合成整张地图；
+        逐点的叠加顺序不变，后绘制的底板仍会压暗先前的图标与数字。
+        """
         icon_size = 20
         offset = scene.physical_width * 0.3 if not scene.reverse_xy else scene.physical_width * 0.3
         
         # 收集所有物品
         items = []
-        for category, category_items in reward.items():
-            for item_id, quantity in category_items.items():
-                icon = self.load_icon(category, int(item_id), icon_size)
-                if icon:
-                    items.append((icon, quantity))
+        for category, item_id, quantity in reward:
+            icon = self.load_icon(category, int(item_id), icon_size)
+            if icon:
+                items.append((icon, quantity))
         
         if not items:
             return
@@ -317,14 +343,14 @@ class MapVisualizer:
             start_x = int(x + offset)
             start_y = int(y)
         
-        # 绘制半透明灰色背景
-        overlay = Image.new('RGBA', background.size, (255, 255, 255, 0))
-        overlay_draw = ImageDraw.Draw(overlay)
-        overlay_draw.rectangle(
-            [start_x, start_y, start_x + total_width, start_y + total_height],
-            fill=(138, 138, 138, 180)
-        )
-        background.paste(Image.alpha_composite(background, overlay), (0, 0))
+        # 绘制半透明灰色背景（矩形含右下边界，超出地图的部分裁掉）
+        left, top = max(start_x, 0), max(start_y, 0)
+        right = min(start_x + total_width, background.width - 1)
+        bottom = min(start_y + total_height, background.height - 1)
+        if right >= left and bottom >= top:
+            region = background.crop((left, top, right + 1, bottom + 1))
+            panel = Image.new('RGBA', region.size, (138, 138, 138, 180))
+            background.paste(Image.alpha_composite(region, panel), (left, top))
         
         # 绘制物品图标和数量
         for i, (icon, quantity) in enumerate(items):
@@ -340,7 +366,6 @@ class MapVisualizer:
             
             # 绘制数量（如果大于1）
             if quantity > 1:
-                draw = ImageDraw.Draw(background)
                 text = str(quantity)
                 # 右下角位置
                 text_x = icon_x + icon_size - 8
@@ -351,7 +376,7 @@ class MapVisualizer:
                 # 绘制黑色数字
                 draw.text((text_x, text_y), text, fill=(0, 0, 0), font=self.font)
     
-    def process_map(self, map_data: Dict, site_id: int):
+    def process_map(self, map_data: Dict, site_id: int) -> Optional[Path]:
         """处理单个地图"""
         if site_id not in self.SCENES:
             print(f"Warning: No scene config for site {site_id}, skipping...")
@@ -361,8 +386,8 @@ class MapVisualizer:
         scene_name = self.SITE_ID_TO_NAME.get(site_id, f"Site_{site_id}")
         print(f"Processing {scene_name} (ID: {site_id})...")
         
-        # 解析原始数据
-        processed_data = self.parse_raw_map_data(map_data)
+        # 解析为列式资源点
+        site = aggregate_site(map_data)
         
         # 加载背景图
         bg_path = self.base_folder / scene.image_path
@@ -370,56 +395,144 @@ class MapVisualizer:
             print(f"  Error: Background image not found: {bg_path}")
             return
         
-        background = Image.open(bg_path).convert('RGBA')
+        background = load_background(bg_path).copy()
         bg_width, bg_height = background.size
         draw = ImageDraw.Draw(background)
         
         # 处理每个资源点
-        for point in processed_data:
-            location = point.get('location', [0, 0])
-            fixture_id = point.get('fixtureId', 0)
-            reward = point.get('reward', {})
-            
+        processed = 0
+        for i in site.spawned():
             # 转换坐标
-            x, y = self.game_to_pixel(location[0], location[1], scene, bg_width, bg_height)
+            x, y = self.game_to_pixel(site.xs[i], site.zs[i], scene, bg_width, bg_height)
             
             # 绘制点和奖励
-            self.draw_point_with_rewards(draw, background, x, y, fixture_id, reward, scene)
+            self.draw_point_with_rewards(background, draw, x, y, site.fixture_ids[i], site.rewards(i), scene)
+            processed += 1
         
         # 保存结果
         output_path = self.output_folder / f"{self.id}_map_{site_id}.png"
         background.save(output_path)
         print(f"  Saved to {output_path}")
-        print(f"  Processed {len(processed_data)} resource points")
+        print(f"  Processed {processed} resource points")
+        return output_path
     
-    def process_all(self):
-        """处理所有地图"""
+    @staticmethod
+    def extract_maps(data: Dict) -> Optional[List[Dict]]:
+        """从原始 API 数据中提取地图列表"""
+        if "updatedResources" in data:
+            if "userMysekaiHarvestMaps" in data["updatedResources"]:
+                return data["updatedResources"]["userMysekaiHarvestMaps"]
+        elif "userMysekaiHarvestMaps" in data:
+            return data["userMysekaiHarvestMaps"]
+        return None
+    
+    @classmethod
+    def render_config(cls, site_id: int, point_size: int = 5, font_size: int = 10) -> Dict:
+        """影响单张地图渲染结果的全部配置，用作缓存键的一部分"""
+        scene = cls.SCENES.get(site_id)
+        return {
+            "version": cls.RENDERER_VERSION,
+            "site_id": site_id,
+            "point_size": point_size,
+            "font_size": font_size,
+            "scene": vars(scene) if scene else None,
+        }
+    
+    def load_maps(self) -> Optional[List[Dict]]:
+        """从 JSON 文件中读取地图数据"""
         print("Loading JSON data...")
         
         with open(self.json_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
         # 查找地图数据
-        maps_data = None
-        
-        # 尝试从原始 API 数据中提取
-        if "updatedResources" in data:
-            if "userMysekaiHarvestMaps" in data["updatedResources"]:
-                maps_data = data["updatedResources"]["userMysekaiHarvestMaps"]
-        elif "userMysekaiHarvestMaps" in data:
-            maps_data = data["userMysekaiHarvestMaps"]
+        maps_data = self.extract_maps(data)
         
         if not maps_data:
             print("Error: Could not find map data in JSON")
             print("Expected path: updatedResources.userMysekaiHarvestMaps")
-            return
+            return None
         
         print(f"Found {len(maps_data)} maps")
+        return maps_data
+    
+    def iter_maps(self, maps_data: List[Dict]) -> Iterator[Tuple[int, Path]]:
+        """渲染地图，每张完成后立即产出 (site_id, 输出路径)，顺序不保证"""
+        jobs = [(map_data, map_data.get("mysekaiSiteId")) for map_data in maps_data]
+        jobs = [(map_data, site_id) for map_data, site_id in jobs if site_id]
+        
+        if self.workers <= 1 or len(jobs) <= 1:
+            for map_data, site_id in jobs:
+                output_path = self.process_map(map_data, site_id)
+                if output_path:
+                    yield site_id, output_path
+            return
+        
+        pool = get_render_pool(self.workers)
+        futures = {
+            pool.submit(_render_map, self._init_args, map_data, site_id): site_id
+            for map_data, site_id in jobs
+        }
+        for future in as_completed(futures):
+            output_path = future.result()
+            if output_path:
+                yield futures[future], output_path
+    
+    @tracer.timed("render")
+    def process_all(self) -> List[Path]:
+        """处理所有地图，返回按 site_id 排序的输出路径"""
+        maps_data = self.load_maps()
+        if not maps_data:
+            return []
         
         # 处理每个地图
-        for map_data in maps_data:
-            site_id = map_data.get("mysekaiSiteId")
-            if site_id:
-                self.process_map(map_data, site_id)
+        results = dict(self.iter_maps(maps_data))
         
-        print("\nAll done!")
\ No newline at end of file
+        print("\nAll done!")
+        return [results[site_id] for site_id in sorted(results)]
+
+def _render_map(init_args: Dict, map_data: Dict, site_id: int) -> Optional[Path]:
+    """进程池任务：在子进程中渲染单张地图"""
+    return MapVisualizer(**dict(init_args, workers=1)).process_map(map_data, site_id)
+
+def _init_render_worker():
+    # fork 时父进程中其他线程可能正持有锁
+    global _ICON_CACHE_LOCK
+    _ICON_CACHE_LOCK = threading.Lock()
+
+_RENDER_POOL: Optional[ProcessPoolExecutor] = None
+_RENDER_POOL_WORKERS = 0
+_RENDER_POOL_LOCK = threading.Lock()
+
+def get_render_pool(workers: int) -> ProcessPoolExecutor:
+    """进程共享的渲染进程池，worker 数变化时重建
+
+    fork 只复制调用线程，其他线程当时持有的锁（stdout、sqlite 等）在子进程中不会释放，
+    插件中应由 start_render_pool 在启动时预先创建；这里的按需创建只供脚本与基准使用。
+    """
+    global _RENDER_POOL, _RENDER_POOL_WORKERS
+    with _RENDER_POOL_LOCK:
+        if _RENDER_POOL is None or _RENDER_POOL_WORKERS != workers:
+            if _RENDER_POOL is not None:
+                _RENDER_POOL.shutdown(wait=False)
+            # 使用 fork 以免子进程重新导入插件包
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            _RENDER_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_render_worker)
+            _RENDER_POOL_WORKERS = workers
+        return _RENDER_POOL
+
+def start_render_pool(workers: int) -> ProcessPoolExecutor:
+    """在其他线程启动前创建渲染进程池，并立即 fork 出全部 worker"""
+    pool = get_render_pool(workers)
+    # fork 上下文下第一次 submit 会一次性创建全部 worker，之后不再 fork
+    pool.submit(int).result()
+    return pool
+
+def shutdown_render_pool():
+    global _RENDER_POOL, _RENDER_POOL_WORKERS
+    with _RENDER_POOL_LOCK:
+        if _RENDER_POOL is not None:
+            _RENDER_POOL.shutdown(wait=False)
+            _RENDER_POOL = None
+            _RENDER_POOL_WORKERS = 0
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+class RenderCache:
+    """按内容寻址的地图渲染缓存，超过容量时按最近使用时间淘汰"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(map_data: Dict, config: Dict) -> str:
+        """地图数据与渲染配置共同决定缓存键"""
+        payload = json.dumps({"config": config, "map": map_data}, sort_keys = True, separators = (",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.png"
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self.path(key)
+        try:
+            # 更新 mtime 作为最近使用时间
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, rendered: Path) -> Path:
+        """将渲染结果移入缓存（同一文件系统内为重命名）
+
+        并发渲染同一地图时先完成的结果生效，后到者丢弃自己的文件并返回已缓存的路径。
+        """
+        self.cache_dir.mkdir(parents = True, exist_ok = True)
+        cached = self.get(key)
+        if cached is not None:
+            self._discard(rendered)
+            return cached
+        path = self.path(key)
+        try:
+            os.replace(rendered, path)
+        except FileNotFoundError:
+            # 源文件已被移走，只要缓存中已有结果即可
+            cached = self.get(key)
+            if cached is None:
+                raise
+            return cached
+        self.evict()
+        return path
+
+    @staticmethod
+    def _discard(path: Path) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(".png"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                    total += st.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -0,0 +1,141 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .gate_cost import MAX_GATE_LEVEL
+
+# (标签, 值)，值为 None 时只输出标签
+Line = Tuple[str, Optional[Any]]
+
+@dataclass
+class UserHeader:
+    """回复开头的用户信息"""
+    user_name: str
+    user_id: str
+    update_time: Any = None
+    expired: bool = False
+
+    def lines(self) -> Iterator[Line]:
+        yield "用户", f"{self.user_name}({self.user_id})"
+        if self.update_time is not None:
+            yield "更新时间", self.update_time
+        if self.expired:
+            yield "数据过期", "请重新上传数据"
+
+@dataclass
+class GateMaterials:
+    """单个团升级到目标等级仍缺少的材料"""
+    unit_name: str
+    current_level: int
+    target_level: int
+    remaining: Dict[str, int] = field(default_factory = dict)
+    header: Optional[UserHeader] = None
+
+    @property
+    def max_level(self) -> bool:
+        return self.current_level >= MAX_GATE_LEVEL
+
+    @property
+    def reached(self) -> bool:
+        return self.current_level >= self.target_level
+
+    def lines(self) -> Iterator[Line]:
+        if self.header is not None:
+            yield from self.header.lines()
+            if self.header.expired:
+                return
+        yield f"当前{self.unit_name}等级", self.current_level
+        if self.max_level:
+            yield "当前团已满级", None
+        elif self.reached:
+            yield "已达到目标等级", None
+        else:
+            yield from self.remaining.items()
+
+@dataclass
+class GateMaterialsBatch:
+    """所有团升级到同一目标等级仍缺少的材料及合计"""
+    header: UserHeader
+    units: List[GateMaterials] = field(default_factory = list)
+    total: Dict[str, int] = field(default_factory = dict)
+
+    def lines(self) -> Iterator[Line]:
+        yield from self.header.lines()
+        if self.header.expired:
+            return
+        for unit in self.units:
+            yield from unit.lines()
+        yield "合计", None
+        yield from self.total.items()
+
+@dataclass
+class SiteMaterials:
+    """单张地图上的材料数量"""
+    site_id: int
+    name: str
+    materials: Dict[str, int] = field(default_factory = dict)
+    # 没有材料时显示的说明，None 表示只显示地图名
+    empty_note: Optional[str] = None
+
+    @property
+    def title(self) -> str:
+        return f"图{self.site_id - 4}：{self.name}"
+
+    def lines(self) -> Iterator[Line]:
+        if not self.materials and self.empty_note is not None:
+            yield self.title, self.empty_note
+            return
+        yield self.title, None
+        yield from self.materials.items()
+
+@dataclass
+class HarvestReport:
+    """各地图的材料掉落"""
+    header: UserHeader
+    sites: List[SiteMaterials] = field(default_factory = list)
+
+    def lines(self) -> Iterator[Line]:
+        yield from self.header.lines()
+        if self.header.expired:
+            return
+        for site in self.sites:
+            yield from site.lines()
+
+@dataclass
+class BlueprintReport:
+    """未获得蓝图的一页"""
+    header: UserHeader
+    obtained: int = 0
+    total: int = 0
+    entries: List[Tuple[int, str]] = field(default_factory = list)
+    missing: int = 0
+    page: int = 1
+    pages: int = 1
+
+    def lines(self) -> Iterator[Line]:
+        yield from self.header.lines()
+        if self.header.expired:
+            return
+        yield "蓝图数量", f"{self.obtained}/{self.total}"
+        if self.obtained >= self.total:
+            yield "蓝图已全部获得", self.total
+            return
+        yield from self.entries
+        yield f"未获取{self.missing}项，第{self.page}/{self.pages}页", None
+
+@dataclass
+class MysekaiInfo:
+    """mysekai 基本信息与天气预报"""
+    header: UserHeader
+    weather: List[Tuple[str, str]] = field(default_factory = list)
+
+    def lines(self) -> Iterator[Line]:
+        yield from self.header.lines()
+        yield "天气预报", None
+        yield from self.weather
+
+def render_text(result: Any) -> str:
+    """将结果对象格式化为文本回复，每行 "标签:值" 或仅标签"""
+    return "\n".join(
+        str(label) if value is None else f"{label}:{value}"
+        for label, value in result.lines()
+    )
@@ -0,0 +1,133 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from .fileio import atomic_write
+
+# 直方图桶上界（秒），最后一个为 +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float("inf"))
+
+# 当前指令名，由 Tracer.command 设置；线程池中的调用依靠 copy_context 继承
+_command: ContextVar[str] = ContextVar("trace_command", default = "-")
+
+class Histogram:
+    """固定桶直方图，分位数按桶内线性插值估计（同 Prometheus histogram_quantile）"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                upper = self.buckets[i]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-2]
+
+class Tracer:
+    """按 (指令, 阶段) 记录耗时直方图
+
+    阶段：fetch 下载用户数据、parse 解析上传文件、member_info 查询群名片、
+    compute 查询计算、render 绘图、send 发送回复、total 整个指令。
+    阶段之间可以嵌套（fetch 包含其中的 parse），各自独立统计。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe(self, command: str, stage: str, elapsed: float) -> None:
+        key = (command, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(elapsed)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """记录一段代码的耗时，异常退出也会记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(_command.get(), stage, time.perf_counter() - start)
+
+    def timed(self, stage: str) -> Callable:
+        """同步函数装饰器"""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def command(self, name: str) -> Callable:
+        """指令处理函数装饰器：设置当前指令名并记录 total 阶段"""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                token = _command.set(name)
+                try:
+                    with self.span("total"):
+                        return await func(*args, **kwargs)
+                finally:
+                    _command.reset(token)
+            return wrapper
+        return decorator
+
+    def summary(self, quantiles: Tuple[float, ...] = (0.5, 0.95, 0.99)) -> List[Tuple[str, str, int, List[float]]]:
+        """[(指令, 阶段, 次数, [各分位数秒数])]，按指令、阶段排序"""
+        with self._lock:
+            return [
+                (command, stage, histogram.count, [histogram.quantile(q) for q in quantiles])
+                for (command, stage), histogram in sorted(self._histograms.items())
+            ]
+
+    def prometheus(self, prefix: str = "gate_helper_stage_seconds") -> str:
+        """Prometheus 文本格式"""
+        lines = [f"# TYPE {prefix} histogram"]
+        with self._lock:
+            for (command, stage), histogram in sorted(self._histograms.items()):
+                labels = f'command="{command}",stage="{stage}"'
+                cumulative = 0
+                for bound, n in zip(histogram.buckets, histogram.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f'{prefix}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{prefix}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{prefix}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Path, extra: str = "") -> Path:
+        """写出 Prometheus 文本文件，可供 node_exporter textfile collector 采集；extra 为追加的其他指标"""
+        atomic_write(path, (self.prometheus() + extra).encode("utf-8"))
+        return Path(path)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+tracer = Tracer()
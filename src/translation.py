@@ -0,0 +1,44 @@
+from typing import Dict, List, Optional
+
+from .master_data import MasterData
+
+# 心愿材料，名称以 reference.json 中的中文译名为准
+MEMORIAL_RANGE = range(35, 61)
+
+class MaterialTranslator:
+    """材料 id 与显示名称的双向索引"""
+
+    def __init__(self, materials: List[Dict], reference: List[Dict], override_range: range = MEMORIAL_RANGE):
+        self.override_range = override_range
+        self.names: Dict[int, str] = {}
+        for row in materials:
+            if row["id"] not in override_range:
+                self.names[row["id"]] = row["name"]
+        for row in reference:
+            if row["id"] in override_range:
+                self.names[row["id"]] = row["name"]
+        self.ids: Dict[str, int] = {self._normalize(name): material_id for material_id, name in self.names.items()}
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        return name.strip().casefold()
+
+    def name(self, material_id: int, default: Optional[str] = None) -> Optional[str]:
+        return self.names.get(material_id, default)
+
+    def lookup_id(self, name: str) -> Optional[int]:
+        """按显示名称查找材料 id，忽略首尾空白与大小写"""
+        return self.ids.get(self._normalize(name))
+
+    def translate(self, data: Dict[int, int]) -> Dict[str, int]:
+        """{材料id: 数量} -> {材料名: 数量}，未知 id 忽略"""
+        names = self.names
+        return {names[material_id]: quantity for material_id, quantity in data.items() if material_id in names}
+
+def material_translator(master: MasterData) -> MaterialTranslator:
+    """随主数据版本缓存的翻译索引"""
+    return master.derived(
+        "material_translator",
+        ("materials", "reference"),
+        lambda m: MaterialTranslator(m.load("materials"), m.load("reference")["reference"])
+    )
@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+from .upload_parser import parse_upload
+from .tracing import tracer
+
+class UploadCache:
+    """用户上传数据的解析缓存（默认缓存 UserUpload 投影）
+
+    以 (路径, mtime, 大小) 判断文件是否变化，按文件大小累计占用，
+    超过 max_bytes 时淘汰最久未使用的条目。返回的对象为共享只读数据，调用方不应修改。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, loader: Callable[[Path], Any] = parse_upload):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._lock = threading.Lock()
+        # 路径 -> (mtime_ns, size, data)
+        self._entries: "OrderedDict[str, Tuple[int, int, Any]]" = OrderedDict()
+        self._total = 0
+
+    def load(self, path: Path) -> Any:
+        path = Path(path)
+        st = path.stat()
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        with tracer.span("parse"):
+            data = self.loader(path)
+        self.put(path, data, st.st_mtime_ns, st.st_size)
+        return data
+
+    def put(self, path: Path, data: Any, mtime_ns: int, size: int) -> None:
+        key = str(path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total -= old[1]
+            self._entries[key] = (mtime_ns, size, data)
+            self._total += size
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size, _) = self._entries.popitem(last = False)
+                self._total -= evicted_size
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            old = self._entries.pop(str(path), None)
+            if old is not None:
+                self._total -= old[1]
+
+upload_cache = UploadCache()
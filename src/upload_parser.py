@@ -0,0 +1,95 @@
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional
+
+try:
+    import ijson
+except ImportError:  # 未安装 ijson 时退回 json.load 后再投影
+    ijson = None
+
+# 上传数据中的路径 -> UserUpload 字段
+PROJECTION = {
+    "upload_time": "upload_time",
+    "userMysekaiGates": "gates",
+    "userMysekaiMaterials": "materials",
+    "mysekaiPhenomenaSchedules": "phenomena_schedules",
+    "updatedResources.now": "now",
+    "updatedResources.userMysekaiHarvestMaps": "harvest_maps",
+    "updatedResources.userMysekaiBlueprints": "blueprints",
+    # 部分导出工具把地图放在顶层
+    "userMysekaiHarvestMaps": "top_level_harvest_maps",
+}
+
+@dataclass
+class UserUpload:
+    """用户 suite / mysekai 上传数据中实际用到的字段"""
+    upload_time: Optional[int] = None
+    now: Optional[int] = None
+    gates: List[Dict] = field(default_factory = list)
+    materials: List[Dict] = field(default_factory = list)
+    harvest_maps: List[Dict] = field(default_factory = list)
+    blueprints: List[Dict] = field(default_factory = list)
+    phenomena_schedules: List[Dict] = field(default_factory = list)
+    # harvest.harvest_matrix 的聚合结果，随缓存的投影一起复用
+    harvest: Any = field(default = None, repr = False, compare = False)
+
+    @classmethod
+    def from_values(cls, values: Dict[str, Any]) -> "UserUpload":
+        top_level_maps = values.pop("top_level_harvest_maps", None)
+        if "harvest_maps" not in values and top_level_maps is not None:
+            values["harvest_maps"] = top_level_maps
+        for key in ("upload_time", "now"):
+            if values.get(key) is not None:
+                values[key] = int(values[key])
+        return cls(**{k: v for k, v in values.items() if v is not None})
+
+def _project(data: Dict) -> Dict[str, Any]:
+    values = {}
+    for path, name in PROJECTION.items():
+        node = data
+        for key in path.split("."):
+            if not isinstance(node, dict) or key not in node:
+                break
+            node = node[key]
+        else:
+            values[name] = node
+    return values
+
+def _stream_project(f: BinaryIO) -> Dict[str, Any]:
+    """单次流式扫描，只构建投影中的子树，其余内容直接跳过"""
+    values = {}
+    builder = None
+    target = None
+    depth = 0
+    for prefix, event, value in ijson.parse(f, use_float = True):
+        if builder is not None:
+            builder.event(event, value)
+            if event == "start_map" or event == "start_array":
+                depth += 1
+            elif event == "end_map" or event == "end_array":
+                depth -= 1
+                if depth == 0:
+                    values[target] = builder.value
+                    builder = None
+            continue
+        if event == "map_key" or prefix not in PROJECTION:
+            continue
+        if event == "start_map" or event == "start_array":
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            target = PROJECTION[prefix]
+            depth = 1
+        else:
+            values[PROJECTION[prefix]] = value
+    return values
+
+def parse_upload_stream(f: BinaryIO) -> UserUpload:
+    if ijson is not None:
+        return UserUpload.from_values(_stream_project(f))
+    return UserUpload.from_values(_project(json.load(f)))
+
+def parse_upload(path: Path) -> UserUpload:
+    """读取用户上传文件并返回投影"""
+    with open(path, "rb") as f:
+        return parse_upload_stream(f)
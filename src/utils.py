@@ -1,14 +1,33 @@
 from pathlib import Path
-import json
 import requests
 from .exception import FileDownloadError, UserError, NotFoundError
+from .master_data import master_data
+from .translation import material_translator, MEMORIAL_RANGE
+from .master_refresh import MasterRefresher
+from .binding_store import binding_store
+from .gate_cost import gate_cost_table, UNIT_GROUPS
+from .blueprint_index import blueprint_index
+from .harvest import harvest_matrix, SITE_NAMES
+from .results import UserHeader, GateMaterials, GateMaterialsBatch, HarvestReport, SiteMaterials, BlueprintReport, MysekaiInfo
+from .upload_cache import upload_cache
+from .upload_parser import UserUpload
+from .fileio import AtomicWriter
+from .fetch_state import FreshnessTracker
+from .http_client import http_client
+from .tracing import tracer
+from typing import Iterable, List, Tuple
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
 
 class Utils:
+    # 用户数据类型 -> (本地文件名, 404 提示, 其他错误提示)
+    USER_DATA = {
+        "suite": ("user_{}.json", "未找到用户数据，请确认你上传的是suite数据且勾选公开API选项", "用户数据下载失败，请使用反馈功能反馈"),
+        "mysekai": ("user_{}_ms.json", "未找到用户数据，请确认你上传的是mysekai数据且勾选公开API选项", "用户ms数据下载失败，请使用反馈功能反馈"),
+    }
+
     def __init__(self):
         self.base_path = Path(__file__).parent.parent
-        self.bond_path = self.base_path / "userdata" / "bond.json"
 
         self.gate_material_path = self.base_path / "data" / "mysekaiGateMaterialGroups.json"
         self.material_path = self.base_path / "data" / "mysekaiMaterials.json"
@@ -16,211 +35,150 @@ class Utils:
         self.blueprints_path = self.base_path / "data" / "mysekaiBlueprints.json"
         self.blueprints_map_path = self.base_path / "data" / "mysekaiFixtures.json"
 
-        self.harvest_path = self.base_path / "data" / "mysekaiSiteHarvestFixtures.json"
-
         self.weather_path = self.base_path / "data" / "mysekaiPhenomenas.json"
-        self.memorial_translate = self.base_path / "data" / "reference.json"
 
-        self.sub_path = self.base_path / "userdata" / "usersubs.json"
+        self.master = master_data
+        self.http = http_client
+        self.refresher = MasterRefresher(self.master, http = self.http)
+        self.store = binding_store
+        self.uploads = upload_cache
+        self.freshness = FreshnessTracker(ttl = 60)
     
     def bond_user(self, user_id: str, uid: str) -> None:
-        if not self.bond_path.exists():
-            with open(self.bond_path, "w", encoding = "utf-8") as f:
-                json.dump([], f)
-        with open(self.bond_path, "r", encoding = "utf-8") as f:
-            data = json.load(f)
-
-        updated = False
-        for item in data:
-            if user_id in item:
-                item[user_id] = uid
-                updated = True
-                break
-
-        if not updated:
-            new_record = {user_id : uid}
-            data.append(new_record)
-
-        with open(self.bond_path, "w", encoding = "utf-8") as f:
-            json.dump(data, f, indent = 4)
-    
+        self.store.set_uid("jp", user_id, uid)
+        # 换绑后本地数据与校验头都属于旧账号，下次查询必须重新下载
+        for kind in self.USER_DATA:
+            self.freshness.invalidate((kind, user_id))
+            self.uploads.invalidate(self.user_data_path(user_id, kind))
+
     def bond_sub(self, user_id: str, sub_id: list) -> None:
-        if not self.sub_path.exists():
-            with open(self.sub_path, "w", encoding = "utf-8") as f:
-                json.dump([], f)
-        with open(self.sub_path, "r", encoding = "utf-8") as f:
-            data = json.load(f)
-        
-        updated = False
-        for item in data:
-            if user_id in item:
-                item[user_id] = sub_id
-                updated = True
-                break
-        if not updated:
-            new_record = {user_id : sub_id}
-            data.append(new_record)
-        
-        with open(self.sub_path, "w", encoding = "utf-8") as f:
-            json.dump(data, f, indent = 4)
-    
-    def get_user_sub(self, user_id: str) -> None:
-        with open(self.sub_path, "r", encoding = "utf-8") as f:
-            data = json.load(f)
-        
-        found = False
-        for item in data:
-            if user_id in item:
-                found = True
-                break
-        if not found:
+        self.store.set_subs(user_id, sub_id)
+
+    def get_user_sub(self, user_id: str) -> list:
+        sub_ids = self.store.get_subs(user_id)
+        if sub_ids is None:
             raise UserError("未找到用户订阅信息，请使用指令[！订阅]进行订阅")
-    
-    def get_user_data(self, user_id: str) -> None:
-        with open(self.bond_path, "r", encoding = "utf-8") as f:
-            data = json.load(f)
-        found = False
-        for item in data:
-            if user_id in item:
-                uid = item[user_id]
-                found = True
-                break
-
-        if not found:
+        return sub_ids
+
+    def parse_material_ids(self, text: str) -> list:
+        translator = material_translator(self.master)
+        material_ids = []
+        for token in text.split():
+            if token.isdigit():
+                material_ids.append(int(token))
+                continue
+            material_id = translator.lookup_id(token)
+            if material_id is None:
+                raise NotFoundError(f"未找到材料：{token}")
+            material_ids.append(material_id)
+        return material_ids
+
+    def get_uid(self, user_id: str) -> str:
+        uid = self.store.get_uid("jp", user_id)
+        if uid is None:
             raise UserError("未绑定用户，使用指令[！绑定 uid]进行绑定")
-        
-        json_path = self.base_path / "data" / f"user_{user_id}.json"
-        url = f"api" # configure it if you need
-
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            with open(json_path, "w", encoding = "utf-8") as f:
-                json.dump(data, f, indent = 4)
-        else:
-            if response.status_code == 404:
-                raise FileDownloadError("未找到用户数据，请确认你上传的是suite数据且勾选公开API选项")
-            else:
-                raise FileDownloadError("用户数据下载失败，请使用反馈功能反馈")
-            
-    def get_user_ms_data(self, user_id: str) -> None:
-        with open(self.bond_path, "r", encoding = "utf-8") as f:
-            data = json.load(f)
-        found = False
-        for item in data:
-            if user_id in item:
-                uid = item[user_id]
-                found = True
-                break
-
-        if not found:
-            raise UserError("未绑定用户，使用指令[！绑定 uid]进行绑定")
-        
-        ms_json_path = self.base_path / "data" / f'user_{user_id}_ms.json'
-        ms_url = f"api" # configure it if you need
-
-        response_ms = requests.get(ms_url)
-        if response_ms.status_code == 200:
-            data = response_ms.json()
-            with open(ms_json_path, "w", encoding = "utf-8") as f:
-                json.dump(data, f, indent = 4)
+        return uid
+
+    def user_data_path(self, user_id: str, kind: str = "suite") -> Path:
+        return self.base_path / "data" / self.USER_DATA[kind][0].format(user_id)
+
+    def user_data_url(self, uid: str, kind: str = "suite") -> str:
+        return f"api" # configure it if you need
+
+    def check_user_response(self, status_code: int, kind: str = "suite") -> None:
+        if status_code == 200:
+            return
+        if status_code == 404:
+            raise FileDownloadError(self.USER_DATA[kind][1])
         else:
-            if response_ms.status_code == 404:
-                raise FileDownloadError("未找到用户数据，请确认你上传的是mysekai数据且勾选公开API选项")
-            else:
-                raise FileDownloadError("用户ms数据下载失败，请使用反馈功能反馈")
-    
+            raise FileDownloadError(self.USER_DATA[kind][2])
+
+    def save_user_data(self, user_id: str, kind: str, chunks: Iterable[bytes]) -> UserUpload:
+        """原样写入下载的字节流，校验通过后替换本地文件"""
+        writer = AtomicWriter(self.user_data_path(user_id, kind))
+        try:
+            writer.write_chunks(chunks)
+        except BaseException:
+            writer.abort()
+            raise
+        return self.commit_user_data(writer, kind)
+
+    def commit_user_data(self, writer: AtomicWriter, kind: str) -> UserUpload:
+        """先解析临时文件，解析失败时丢弃下载内容、保留上一次的数据"""
+        writer.flush()
+        try:
+            with tracer.span("parse"):
+                upload = self.uploads.loader(Path(writer.tmp_name))
+            if upload.upload_time is None:
+                raise ValueError("missing upload_time")
+        except Exception:
+            writer.abort()
+            raise FileDownloadError(self.USER_DATA[kind][2])
+        writer.commit()
+        st = writer.path.stat()
+        self.uploads.put(writer.path, upload, st.st_mtime_ns, st.st_size)
+        return upload
+
+    def load_user_data(self, user_id: str, kind: str = "suite") -> UserUpload:
+        return self.uploads.load(self.user_data_path(user_id, kind))
+
+    def fetch_user_data(self, user_id: str, kind: str) -> UserUpload:
+        """TTL 内直接使用本地数据，否则发送条件请求；并发请求同一用户时只下载一次"""
+        path = self.user_data_path(user_id, kind)
+        key = (kind, user_id)
+        if self.freshness.is_fresh(key, path):
+            return self.uploads.load(path)
+
+        with self.freshness.lock(key):
+            # 等锁期间其他线程可能已完成下载
+            if self.freshness.is_fresh(key, path):
+                return self.uploads.load(path)
+
+            with tracer.span("fetch"):
+                uid = self.get_uid(user_id)
+                headers = self.freshness.conditional_headers(key, path)
+                try:
+                    response = self.http.get(self.user_data_url(uid, kind), headers = headers, stream = True)
+                except requests.RequestException:
+                    raise FileDownloadError(self.USER_DATA[kind][2])
+                with response:
+                    if response.status_code == 304:
+                        self.freshness.touch(key)
+                        return self.uploads.load(path)
+                    self.check_user_response(response.status_code, kind)
+                    upload = self.save_user_data(user_id, kind, response.iter_content(chunk_size = 65536))
+                    self.freshness.record(key, response.headers, upload.upload_time)
+                    return upload
+
+    def get_user_data(self, user_id: str) -> UserUpload:
+        return self.fetch_user_data(user_id, "suite")
+
+    def get_user_ms_data(self, user_id: str) -> UserUpload:
+        return self.fetch_user_data(user_id, "mysekai")
+
     def get_gate_information(self) -> None:
-        url = f"https://raw.githubusercontent.com/Team-Haruki/haruki-sekai-master/main/master/mysekaiGateMaterialGroups.json"
+        self.refresher.refresh(["gate_materials"])
 
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            with open(self.gate_material_path, "w", encoding = "utf-8") as f:
-                json.dump(data, f, indent = 4)
-        else:
-            raise FileDownloadError("升级材料下载失败，若多次重试仍然失败，请使用反馈功能反馈")
-        
     def get_material_map(self) -> None:
-        url = f"https://raw.githubusercontent.com/Team-Haruki/haruki-sekai-master/main/master/mysekaiMaterials.json"
+        self.refresher.refresh(["materials"])
 
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            with open(self.material_path, "w", encoding = "utf-8") as f:
-                json.dump(data, f, indent = 4)
-        else:
-            raise FileDownloadError("材料映射下载失败，若多次重试仍然失败，请使用反馈功能反馈")
-    
     def get_blueprints_infomation(self) -> None:
-        url = f"https://raw.githubusercontent.com/Team-Haruki/haruki-sekai-master/main/master/mysekaiBlueprints.json"
-
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            with open(self.blueprints_path, "w", encoding = "utf-8") as f:
-                json.dump(data, f, indent = 4)
-        else:
-            raise FileDownloadError("蓝图信息下载失败，若多次重试仍然失败，请使用反馈功能反馈")
+        self.refresher.refresh(["blueprints"])
 
     def get_blueprints_map(self) -> None:
-        url = f"https://raw.githubusercontent.com/Team-Haruki/haruki-sekai-master/main/master/mysekaiFixtures.json"
+        self.refresher.refresh(["fixtures"])
 
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            with open(self.blueprints_map_path, "w", encoding = "utf-8") as f:
-                json.dump(data, f, indent = 4)
-        else:
-            raise FileDownloadError("蓝图映射下载失败，若多次重试仍然失败，请使用反馈功能反馈")
-    
     def get_weather_map(self) -> None:
-        url = f"https://raw.githubusercontent.com/Team-Haruki/haruki-sekai-master/main/master/mysekaiPhenomenas.json"
+        self.refresher.refresh(["phenomenas"])
 
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            with open(self.weather_path, "w", encoding = "utf-8") as f:
-                json.dump(data, f, indent = 4)
-        else:
-            raise FileDownloadError("天气映射下载失败，若多次重试仍然失败，请使用反馈功能反馈")
-    
-    def get_harvest_info(self) -> None:
-        url = f"https://raw.githubusercontent.com/Team-Haruki/haruki-sekai-master/main/master/mysekaiSiteHarvestFixtures.json"
-
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            with open(self.harvest_path, "w", encoding = "utf-8") as f:
-                json.dump(data, f, indent = 4)
-        else:
-            raise FileDownloadError("地图材料信息下载失败，若多次重试仍然失败，请使用反馈功能反馈")
-    
-    def data_update(self) -> None:
-        try:
-            self.get_gate_information()
-        except FileDownloadError:
-            raise
-        try:
-            self.get_material_map()
-        except FileDownloadError:
-            raise
-        try:
-            self.get_blueprints_infomation()
-        except FileDownloadError:
-            raise
-        try:
-            self.get_blueprints_map()
-        except FileDownloadError:
-            raise
-        try:
-            self.get_weather_map()
-        except FileDownloadError:
-            raise
+    def get_harvest_map(self) -> None:
+        self.refresher.refresh(["harvest_fixtures"])
+
+    def data_update(self) -> list:
         try:
-            self.get_harvest_info()
-        except FileDownloadError:
-            raise
+            return self.refresher.refresh()
+        finally:
+            self.master.invalidate()
 
     @staticmethod
     def classify_day(timestamp: int) -> str:
@@ -239,201 +197,131 @@ class Utils:
         else:
             return date.strftime("%Y-%m-%d %H:%M")
     
-    def get_mysekai_weather(self, user_id: str) -> dict:
-        ms_json_path = self.base_path / "data" / f'user_{user_id}_ms.json'
-        with open(ms_json_path, "r", encoding = "utf-8") as f:
-            userdata_ms = json.load(f)
+    def get_mysekai_weather(self, user_id: str) -> List[Tuple[str, str]]:
+        userdata_ms = self.load_user_data(user_id, "mysekai")
         
-        with open(self.weather_path, "r", encoding = "utf-8") as f:
-            weather_map = json.load(f)
-        
-        weather_dict = {}
-        weather_dict.update({"天气预报": ""})
-        for item in userdata_ms["mysekaiPhenomenaSchedules"]:
+        weather_map = self.master.index("phenomenas")
+
+        weather = []
+        for item in userdata_ms.phenomena_schedules:
             t = self.classify_day(int(int(item["scheduleDate"]) / 1000 + (int(item["mysekaiRefreshTimePeriodId"]) - 1) * 43200))
-            name = next(
-                (weather["name"] for weather in weather_map if weather["id"] == item["mysekaiPhenomenaId"]),
-                "未知天气"
-                )
-            weather_dict.update({f"{t}": name})
+            phenomena = weather_map.get(item["mysekaiPhenomenaId"])
+            weather.append((t, phenomena["name"] if phenomena else "未知天气"))
         
-        return weather_dict
-    
-    def get_ms_info(self, user_id: str, user_name: str) -> dict:
-        ms_info = {"用户": user_name + "(" + user_id + ")"}
-        ms_json_path = self.base_path / "data" / f'user_{user_id}_ms.json'
-        with open(ms_json_path, "r", encoding = "utf-8") as f:
-            userdata_ms = json.load(f)
-
-        update_time = datetime.fromtimestamp(int(userdata_ms["upload_time"]))
-        ms_info.update({"更新时间": update_time})
-
-        ms_info.update(self.get_mysekai_weather(user_id))
-
-        return ms_info
-
-    def get_blurprints_unobtained(self, number: int, user_id: str, user_name: str) -> dict:
-        blueprints_unobtained = {"用户": user_name + "(" + user_id + ")"}
+        return weather
 
-        with open(self.blueprints_path, "r", encoding = "utf-8") as f:
-            blueprints_map = json.load(f) #蓝图字典
-
-        with open(self.blueprints_map_path, "r", encoding = "utf-8") as f:
-            blueprints_fixtures = json.load(f) #家具字典
-
-        ms_json_path = self.base_path / "data" / f'user_{user_id}_ms.json'
-        with open(ms_json_path, "r", encoding = "utf-8") as f:
-            userdata_ms = json.load(f)
-
-        update_time = datetime.fromtimestamp(int(userdata_ms["upload_time"]))
-        now_time = int(datetime.now().timestamp())
-        blueprints_unobtained.update({"更新时间": update_time})
-        if now_time - int(userdata_ms["upload_time"]) > 86400:
-            blueprints_unobtained.update({"数据过期": "请重新上传数据"})
-            return blueprints_unobtained
-        blueprints_unobtained.update({"蓝图数量": str(len(userdata_ms["updatedResources"]["userMysekaiBlueprints"])) + '/' + str(len(blueprints_map))})
-
-        if len(userdata_ms["updatedResources"]["userMysekaiBlueprints"]) == len(blueprints_map):
-            blueprints_unobtained.update({"蓝图已全部获得": len(blueprints_map)})
-            return blueprints_unobtained
-        else:
-            count = number
-            obtained_ids = {mi["mysekaiBlueprintId"] for mi in userdata_ms["updatedResources"]["userMysekaiBlueprints"]}
-            miss_ids = [bp["id"] for bp in blueprints_map if bp["id"] not in obtained_ids]
-            for i in miss_ids[:count]:
-                blueprints_unobtained.update({i: next((fixture['name'] for fixture in blueprints_fixtures if fixture['id'] == i), "Name not found")})
-            
-            blueprints_unobtained.update({f"由于长度限制，显示未获取的前{number}项": ""})
-            return blueprints_unobtained
-
-    def get_materials_needed(self, groupid: int, level: int, user_id: str, user_name: str) -> dict:
-        materials_needed = {"用户": user_name + "(" + user_id + ")"}
-
-        with open(self.gate_material_path, "r", encoding = "utf-8") as f:
-            gate_material_map = json.load(f)
-
-        json_path = self.base_path / "data" / f"user_{user_id}.json"
-        with open(json_path, "r", encoding = "utf-8") as f:
-            userdata = json.load(f)
-        
-        update_time = datetime.fromtimestamp(int(userdata["upload_time"]))
+    @staticmethod
+    def user_header(user_id: str, user_name: str, upload_time: int) -> UserHeader:
+        """上传时间超过一天视为过期"""
         now_time = int(datetime.now().timestamp())
-        materials_needed.update({"更新时间": update_time})
-        if now_time - int(userdata["upload_time"]) > 86400:
-            materials_needed.update({"数据过期": "请重新上传数据"})
-            return materials_needed
-        materials_needed.update({f"当前{self.get_unit_name(groupid)}等级": userdata["userMysekaiGates"][int(groupid/1000)-1]["mysekaiGateLevel"]})
-        if userdata["userMysekaiGates"][int(groupid/1000)-1]["mysekaiGateLevel"] == 40:
-            materials_needed.update({"当前团已满级": 40})
-            return materials_needed
-        elif level <= userdata["userMysekaiGates"][int(groupid/1000)-1]["mysekaiGateLevel"]:
-            materials_needed.update({"已达到目标等级": level})
-            return materials_needed
-
-        data_to_translate = {}
-
-        for i in range(userdata["userMysekaiGates"][int(groupid/1000)-1]["mysekaiGateLevel"] + 1, level + 1):
-            for item in gate_material_map:
-                if groupid + i == item["groupId"]:
-                    if item["mysekaiMaterialId"] in data_to_translate:
-                        data_to_translate[item["mysekaiMaterialId"]] += item["quantity"]
-                    else:
-                        data_to_translate[item["mysekaiMaterialId"]] = item["quantity"]
-
-        for item in userdata["userMysekaiMaterials"]:
-            if item["mysekaiMaterialId"] in data_to_translate:
-                data_to_translate[item["mysekaiMaterialId"]] -= item["quantity"]
-                if data_to_translate[item["mysekaiMaterialId"]] <= 0:
-                    del data_to_translate[item["mysekaiMaterialId"]]
-
-        materials_needed.update(self.data_translate(data_to_translate))
-        return materials_needed
+        return UserHeader(user_name, user_id, datetime.fromtimestamp(upload_time), now_time - upload_time > 86400)
     
-    def data_translate(self, data: dict) -> dict:
-        with open(self.material_path, "r", encoding = "utf-8") as f:
-            material_map = json.load(f)
+    @tracer.timed("compute")
+    def get_ms_info(self, user_id: str, user_name: str) -> MysekaiInfo:
+        userdata_ms = self.load_user_data(user_id, "mysekai")
+        header = UserHeader(user_name, user_id, datetime.fromtimestamp(userdata_ms.upload_time))
+        return MysekaiInfo(header, self.get_mysekai_weather(user_id))
+
+    @tracer.timed("compute")
+    def get_blurprints_unobtained(
+        self,
+        number: int,
+        user_id: str,
+        user_name: str,
+        page: int = 1,
+        category: str = None,
+        genre: int = None
+    ) -> BlueprintReport:
+        index = blueprint_index(self.master)
+
+        userdata_ms = self.load_user_data(user_id, "mysekai")
+
+        report = BlueprintReport(self.user_header(user_id, user_name, userdata_ms.upload_time))
+        if report.header.expired:
+            return report
+        report.obtained = len(userdata_ms.blueprints)
+        report.total = len(index)
+        if report.obtained >= report.total:
+            return report
+
+        obtained_ids = {mi["mysekaiBlueprintId"] for mi in userdata_ms.blueprints}
+        missing = index.missing(obtained_ids, category, genre)
+        entries, report.pages = index.page(missing, page, number)
+        report.entries = [(entry.id, entry.name) for entry in entries]
+        report.missing = len(missing)
+        report.page = min(max(page, 1), report.pages)
+        return report
+
+    @tracer.timed("compute")
+    def get_materials_needed(self, groupid: int, level: int, user_id: str, user_name: str) -> GateMaterials:
+        cost_table = gate_cost_table(self.master)
+
+        userdata = self.load_user_data(user_id, "suite")
         
-        translated_materials_needed = {}
-        for materialId, quantity in data.items():
-            for item in material_map:
-                if materialId == item["id"] and (materialId < 35 or materialId > 60):
-                    translated_materials_needed[item["name"]] = quantity
-                    break
-        
-        with open(self.memorial_translate, "r", encoding = "utf-8") as f:
-            memorial_map = json.load(f)
-
-        for materialId, quantity in data.items():
-            for item in memorial_map["reference"]:
-                if materialId == item["id"] and (materialId >= 35 and materialId <= 60):
-                    translated_materials_needed[item["name"]] = quantity
-                    break
+        header = self.user_header(user_id, user_name, userdata.upload_time)
+        current_level = userdata.gates[int(groupid/1000)-1]["mysekaiGateLevel"]
+        result = GateMaterials(self.get_unit_name(groupid), current_level, level, header = header)
+        if header.expired or result.max_level or result.reached:
+            return result
 
-        return translated_materials_needed
+        needed = cost_table.between(groupid, current_level, level)
+        owned = cost_table.owned_vector(userdata.materials)
+        result.remaining = self.data_translate(cost_table.remaining(needed, owned))
+        return result
     
-    def get_harvest_info(self, user_id: str, user_name: str) -> list:
-        result = []
-        harvest_info = {"用户": user_name + "(" + user_id + ")"}
+    @tracer.timed("compute")
+    def get_materials_needed_all(self, level: int, user_id: str, user_name: str) -> GateMaterialsBatch:
+        """一次计算所有团升到 level 仍缺少的材料，最后附上合计"""
+        cost_table = gate_cost_table(self.master)
+        translator = material_translator(self.master)
 
-        json_path = self.base_path / "data" / f"user_{user_id}_ms.json"
-        with open(json_path, "r", encoding = "utf-8") as f:
-            userdata = json.load(f)
-        
-        with open(self.sub_path, "r", encoding = "utf-8") as f:
-            subdata = json.load(f)
+        userdata = self.load_user_data(user_id, "suite")
 
-        # with open(self.harvest_path, "r", encoding = "utf-8") as f:
-        #     harvest_map = json.load(f)
-        
-        with open(self.material_path, "r", encoding = "utf-8") as f:
-            material_map = json.load(f)
-        
-        update_time = datetime.fromtimestamp(int(userdata["upload_time"]))
-        now_time = int(datetime.now().timestamp())
-        harvest_info.update({"更新时间": update_time})
-        
-        if now_time - int(userdata["upload_time"]) > 86400:
-            harvest_info.update({"数据过期": "请重新上传数据"})
-            result.append(harvest_info)
+        result = GateMaterialsBatch(self.user_header(user_id, user_name, userdata.upload_time))
+        if result.header.expired:
             return result
+
+        levels = {
+            int(gate["mysekaiGateId"] * 1000): gate["mysekaiGateLevel"]
+            for gate in userdata.gates
+            if int(gate["mysekaiGateId"] * 1000) in UNIT_GROUPS
+        }
+        owned = cost_table.owned_vector(userdata.materials)
+        per_unit, total = cost_table.remaining_all(levels, level, owned)
+
+        for unit in UNIT_GROUPS:
+            if unit in levels:
+                result.units.append(GateMaterials(
+                    self.get_unit_name(unit), levels[unit], level, translator.translate(per_unit[unit])
+                ))
+        result.total = translator.translate(total)
+        return result
+
+    def data_translate(self, data: dict) -> dict:
+        return material_translator(self.master).translate(data)
+    
+    @tracer.timed("compute")
+    def get_harvest_info(self, user_id: str, user_name: str) -> HarvestReport:
+        userdata = self.load_user_data(user_id, "mysekai")
         
-        result.append(harvest_info)
+        translator = material_translator(self.master)
+
+        report = HarvestReport(self.user_header(user_id, user_name, userdata.upload_time))
+        if report.header.expired:
+            return report
         
-        for item in subdata:
-            if user_id in item:
-                sub_ids = item[user_id]
-
-        for item in userdata["updatedResources"]["userMysekaiHarvestMaps"]:
-            material_info = {}
-            map_id = item["mysekaiSiteId"]
-            if map_id == 5:
-                map_name = "さいしょの原っぱ"
-            elif map_id == 6:
-                map_name = "願いの砂浜"
-            elif map_id == 7:
-                map_name = "彩りの花畑"
-            elif map_id == 8:
-                map_name = "忘れ去られた場所"
-            material_info.update({f"图{map_id - 4}：{map_name}": ""})
-            material_dict = {}
-            for i in sub_ids:
-                material_dict.update({i: 0})
-            for fixture in item["userMysekaiSiteHarvestResourceDrops"]:
-                if fixture["resourceId"] in sub_ids:
-                    material_dict[fixture["resourceId"]] += fixture["quantity"]
-
-            flag = False
-            for k, v in material_dict.items():
-                for item in material_map:
-                    if k == item["id"] and (k < 35 or k > 60):
-                        if v != 0:
-                            material_info.update({item["name"]: v})
-                            flag = True
-            if not flag:
-                material_info.update({f"图{map_id - 4}：{map_name}": "没有你想要的材料"})
-            result.append(material_info)
+        sub_ids = self.get_user_sub(user_id)
 
-        return result
+        matrix = harvest_matrix(userdata)
+        for map_id in matrix.sites:
+            materials = {}
+            for k, v in matrix.select(map_id, sub_ids).items():
+                name = translator.name(k)
+                if name and k not in MEMORIAL_RANGE and v != 0:
+                    materials[name] = v
+            report.sites.append(SiteMaterials(map_id, SITE_NAMES.get(map_id, ""), materials, "没有你想要的材料"))
+
+        return report
 
     def get_unit(self, unit: str, user_id: str) -> int:
         ln = ["ln", "leo/need", "blue", "狮雨星绊", "ick", "saki", "hnm", "shiho"]
@@ -443,10 +331,8 @@ class Utils:
         nigo = ["25", "nigo", "25h", "purple", "25时", "knd", "mfy", "ena", "mzk"]
 
         if not unit:
-            json_path = self.base_path / "data" / f"user_{user_id}.json"
-            with open(json_path, "r", encoding = "utf-8") as f:
-                userdata = json.load(f)
-            for item in userdata["userMysekaiGates"]:
+            userdata = self.load_user_data(user_id, "suite")
+            for item in userdata.gates:
                 if item["isSettingAtHomeSite"]:
                     return int(item["mysekaiGateId"] * 1000)
         if unit in ln:
@@ -474,10 +360,9 @@ class Utils:
         elif unit == 5000:
             return "25"
     
+    @tracer.timed("render")
     def generate_card_pic(self, user_id: str) -> str:
-        json_path = self.base_path / "data" / f"user_{user_id}.json"
-        with open(json_path, "r", encoding = "utf-8") as f:
-            userdata = json.load(f)
+        userdata = self.load_user_data(user_id, "suite")
         
         image = Image.new("RGB", (1280, 720), (255, 255, 255))
         draw = ImageDraw.Draw(image)
@@ -485,7 +370,7 @@ class Utils:
         font_path = self.base_path / "src" / "font" / "SOURCEHANSANSCN-REGULAR.OTF"
         font = ImageFont.truetype(font_path, 40)
 
-        update_time = datetime.fromtimestamp(int(userdata["upload_time"]))
+        update_time = datetime.fromtimestamp(userdata.upload_time)
         test_text = f"更新时间: {update_time}"
         draw.text((20, 20), test_text, fill=(0, 0, 0), font=font)
 